@@ -7,13 +7,13 @@ import json
 import sys
 import os
 import io
-import zipfile
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from lib.pdf_converter import PDFToFlipbook
+from lib.pdf_converter import PDFToFlipbook, PROFILES, DEFAULT_PROFILE
+from lib.packaging import safe_name, write_flipbook_zip
 
 # For local development
 try:
@@ -31,6 +31,7 @@ def handler(request):
     - pdf: PDF file
     - title: Title for flipbook (optional)
     - account: Account identifier (optional)
+    - profile: Conversion profile - fast / balanced / archival (optional)
 
     Returns:
     - ZIP file with complete flipbook
@@ -57,6 +58,7 @@ def handler(request):
         pdf_file = request.files.get('pdf')
         title = request.form.get('title', 'Zpravodaj')
         account = request.form.get('account', 'default')
+        profile = request.form.get('profile', DEFAULT_PROFILE)
 
         if not pdf_file:
             return {
@@ -65,40 +67,28 @@ def handler(request):
                 'body': json.dumps({'error': 'PDF file is required'})
             }
 
+        if profile not in PROFILES:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': f"Unknown profile '{profile}', expected one of: {', '.join(PROFILES)}"})
+            }
+
         # Read PDF bytes
         pdf_bytes = pdf_file.read()
 
         # Convert PDF to flipbook
-        converter = PDFToFlipbook(pdf_bytes, title)
+        converter = PDFToFlipbook(pdf_bytes, title, profile=profile)
         result = converter.convert()
 
-        # Create ZIP file in memory
+        safe_title = safe_name(title)
+        # Create ZIP file in memory - without the original PDF (the client has it),
+        # the response must fit the 4.5 MB Vercel limit
         zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Add HTML
-            zip_file.writestr('index.html', result['html'])
-
-            # Add CSS
-            zip_file.writestr('css/style.css', result['css'])
-
-            # Add JS
-            zip_file.writestr('js/flipbook.js', result['js'])
-
-            # Add page images
-            for i, page_bytes in enumerate(result['pages'], start=1):
-                zip_file.writestr(f'files/pages/{i}.jpg', page_bytes)
-
-            # Add thumbnails
-            for i, thumb_bytes in enumerate(result['thumbs'], start=1):
-                zip_file.writestr(f'files/thumb/{i}.jpg', thumb_bytes)
-
-        # Get ZIP bytes
-        zip_buffer.seek(0)
-        zip_bytes = zip_buffer.read()
+        write_flipbook_zip(result, safe_title, zip_buffer, include_pdf=False)
+        zip_bytes = zip_buffer.getvalue()
 
         # Generate filename
-        safe_title = title.replace(' ', '-').replace('/', '-').lower()
         filename = f"{safe_title}-flipbook.zip"
 
         return {
@@ -2,15 +2,51 @@
 Flask app for Railway deployment
 """
 
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, abort, request, send_file, send_from_directory, jsonify, stream_with_context
 from flask_cors import CORS
-import io
-import zipfile
-from lib.pdf_converter import PDFToFlipbook
+from werkzeug.http import dump_options_header
+from werkzeug.security import safe_join
+import os
+import json
+import time
+import uuid
+import threading
+import mimetypes
+import unicodedata
+from pathlib import Path
+from urllib.parse import quote
+from lib.pdf_converter import PDFToFlipbook, PROFILES, DEFAULT_PROFILE
+from lib.packaging import safe_name, stream_flipbook_zip, publish_shared_assets, DirectorySink, StreamingPackage
+from lib.assets import ASSETS_DIR, ENCODING_SUFFIXES, asset_urls, cache_control, registry, relative_root
+from lib.jobs import create_job_store, JobWorkers
 
 app = Flask(__name__, static_folder='public', static_url_path='')
 CORS(app)
 
+# Published flipbooks (deferred OCR mode) when S3 is not configured
+FLIPBOOKS_DIR = Path(os.environ.get('FLIPBOOKS_DIR', 'flipbooks')).resolve()
+
+# Shared CSS/JS are read, hashed and compressed at startup instead of in the first request
+registry()
+
+# Asynchronous conversion jobs (see lib/jobs.py)
+job_store = create_job_store()
+job_workers = JobWorkers(job_store)
+
+# SQLite jobs run in worker threads of this process - started right away, so jobs
+# left queued or with an expired lease by a restart or crash are picked up without
+# waiting for the next submit (gunicorn imports the app after fork, no --preload)
+if job_store.local_workers:
+    job_workers.start()
+
+# Progress event stream - store polling interval (Postgres opens a connection per poll),
+# keep-alive comment interval and maximum stream duration (seconds). A stream never
+# holds a request thread for longer than EVENTS_MAX_DURATION - the browser reconnects
+# and gets the current state right away.
+EVENTS_POLL_INTERVAL = 0.5 if job_store.local_workers else 2.0
+EVENTS_KEEPALIVE = 15
+EVENTS_MAX_DURATION = 300
+
 
 @app.route('/')
 def index():
@@ -18,6 +54,111 @@ def index():
     return app.send_static_file('index.html')
 
 
+@app.route('/api/features', methods=['GET'])
+def features():
+    """Options this backend supports (the frontend hides the rest - Vercel/Lambda only convert to ZIP)"""
+    return jsonify({'defer_ocr': True, 'jobs': True})
+
+
+@app.route('/flipbooks/<path:filename>')
+def flipbook_file(filename):
+    """
+    Serve flipbooks published to local disk
+
+    Text files come from their precompressed .br / .gz variant when the
+    browser accepts it, hashed pages and assets are cached for a year.
+    """
+    # Resolve the user-supplied path before touching the file system
+    path = safe_join(str(FLIPBOOKS_DIR), filename)
+    if path is None:
+        abort(404)
+
+    response = None
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        if encoding in request.accept_encodings and os.path.isfile(path + suffix):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(FLIPBOOKS_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+
+    if response is None:
+        response = send_from_directory(FLIPBOOKS_DIR, filename)
+
+    response.headers['Cache-Control'] = cache_control(filename)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _start_publishing(folder, safe_title):
+    """
+    Start publishing a flipbook to S3 (if AWS_S3_BUCKET is set) or local disk
+
+    Pages are written while the PDF is still being converted, CSS/JS come
+    from the shared assets folder (published once).
+
+    Args:
+        folder: Target folder (e.g. "account/zpravodaj-1a2b3c4d")
+        safe_title: Sanitized title (PDF file name)
+
+    Returns:
+        Tuple (streaming, index_url, urls) - streaming.add_page is the converter
+        on_page callback, streaming.finish(result) writes the rest and
+        streaming.sink.write(name, data, content_type) stores another file later,
+        urls are the asset_urls for convert()
+    """
+    urls = asset_urls(relative_root(folder))
+
+    bucket = os.environ.get('AWS_S3_BUCKET')
+    if bucket:
+        from lib.s3_uploader import S3Uploader
+
+        uploader = S3Uploader(bucket, os.environ.get('AWS_REGION', 'us-east-1'))
+        uploader.publish_shared_assets()
+        return uploader.stream_flipbook(folder, safe_title), uploader.folder_url(folder) + '/index.html', urls
+
+    # Folder names come from safe_name(), this only guards against a future caller that skips it
+    target = (FLIPBOOKS_DIR / folder).resolve()
+    if FLIPBOOKS_DIR not in target.parents:
+        raise ValueError(f"Flipbook folder '{folder}' is outside {FLIPBOOKS_DIR}")
+
+    publish_shared_assets(DirectorySink(FLIPBOOKS_DIR / ASSETS_DIR, precompress=True), str(FLIPBOOKS_DIR))
+    sink = DirectorySink(target, precompress=True)
+    return StreamingPackage(sink, safe_title), f'/flipbooks/{folder}/index.html', urls
+
+
+def _index_search_data(converter, write_file):
+    """
+    Background job - run OCR and store search data next to the published flipbook
+
+    search_data.json is written last, its presence tells the viewer indexing is done.
+    """
+    try:
+        search_data = converter.extract_search_data()
+        write_file('manifest.json', converter.get_manifest().encode('utf-8'), 'application/json')
+    except Exception:
+        import traceback
+        print(f"Error: background OCR failed: {traceback.format_exc()}")
+        # Empty index still stops the viewer from waiting forever
+        search_data = json.dumps({'pages': {}, 'positions': {}})
+
+    write_file('search_data.json', search_data.encode('utf-8'), 'application/json')
+    print("Background search indexing finished")
+
+
+def _content_disposition(filename):
+    """Attachment header with ASCII fallback for non-ASCII (Czech) file names"""
+    # Control characters (CR/LF...) have no place in a header
+    filename = ''.join(c for c in filename if unicodedata.category(c)[0] != 'C')
+    simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+
+    options = {'filename': simple}
+    if simple != filename:
+        options['filename*'] = f"UTF-8''{quote(filename)}"
+
+    # Werkzeug quotes the fallback name and escapes quotes and backslashes in it
+    return dump_options_header('attachment', options)
+
+
 @app.route('/api/convert', methods=['POST'])
 def convert():
     """Convert PDF to flipbook ZIP"""
@@ -29,67 +170,56 @@ def convert():
         pdf_file = request.files['pdf']
         title = request.form.get('title', 'Zpravodaj')
         account = request.form.get('account', 'default')
+        profile = request.form.get('profile', DEFAULT_PROFILE)
+        defer_ocr = request.form.get('defer_ocr', '').lower() in ('1', 'true', 'on', 'yes')
+
+        if profile not in PROFILES:
+            return jsonify({'error': f"Unknown profile '{profile}', expected one of: {', '.join(PROFILES)}"}), 400
 
         # Read PDF bytes
         pdf_bytes = pdf_file.read()
 
-        # Convert PDF to flipbook
-        converter = PDFToFlipbook(pdf_bytes, title)
-        result = converter.convert()
-
         # Generate safe filename early (needed for PDF in ZIP)
-        safe_title = title.replace(' ', '-').replace('/', '-').lower()
-
-        # Create ZIP file in memory
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Add HTML
-            zip_file.writestr('index.html', result['html'])
+        safe_title = safe_name(title)
 
-            # Add CSS
-            zip_file.writestr('css/style.css', result['css'])
+        if not defer_ocr:
+            # Stream ZIP while converting - pages go out as soon as they are encoded,
+            # index.html and search data last (ZIP bundles its own CSS/JS). Returns once
+            # the first page is encoded, an unreadable PDF still ends in the JSON error below.
+            def convert_pdf(on_page):
+                return PDFToFlipbook(pdf_bytes, title, profile=profile, on_page=on_page).convert()
 
-            # Add JS
-            zip_file.writestr('js/flipbook.js', result['js'])
+            chunks = stream_flipbook_zip(convert_pdf, safe_title)
+            filename = f"{safe_title}-flipbook.zip"
+            response = Response(chunks, mimetype='application/zip')
+            response.headers['Content-Disposition'] = _content_disposition(filename)
+            return response
 
-            # Add JS libraries (local copies for offline use)
-            libraries = {
-                'js/jquery-3.6.0.min.js': 'static/jquery-3.6.0.min.js',
-                'js/turn.min.js': 'static/turn.min.js',
-                'js/qrcode.min.js': 'static/qrcode.min.js'
-            }
-            for zip_path, file_path in libraries.items():
-                with open(file_path, 'rb') as f:
-                    zip_file.writestr(zip_path, f.read())
+        # Deferred OCR - publish pages while converting, index search in the background
+        folder = f"{safe_name(account)}/{safe_title}-{uuid.uuid4().hex[:8]}"
+        streaming, index_url, urls = _start_publishing(folder, safe_title)
 
-            # Add page images
-            for i, page_bytes in enumerate(result['pages'], start=1):
-                zip_file.writestr(f'files/pages/{i}.jpg', page_bytes)
+        converter = PDFToFlipbook(pdf_bytes, title, profile=profile, on_page=streaming.add_page)
+        try:
+            result = converter.convert(defer_ocr=True, asset_urls=urls)
+        except Exception:
+            streaming.abort()
+            raise
 
-            # Add thumbnails
-            for i, thumb_bytes in enumerate(result['thumbs'], start=1):
-                zip_file.writestr(f'files/thumb/{i}.jpg', thumb_bytes)
+        streaming.finish(result)
 
-            # Add search data
-            zip_file.writestr('search_data.json', result['search_data'])
+        threading.Thread(
+            target=_index_search_data,
+            args=(converter, streaming.sink.write),
+            daemon=True
+        ).start()
 
-            # Add original PDF for download
-            safe_pdf_name = safe_title + '.pdf'
-            zip_file.writestr(safe_pdf_name, result['pdf'])
-
-        # Get ZIP bytes
-        zip_buffer.seek(0)
-
-        # Generate filename
-        filename = f"{safe_title}-flipbook.zip"
-
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
-        )
+        return jsonify({
+            'url': index_url,
+            'search_data_url': index_url.rsplit('/', 1)[0] + '/search_data.json',
+            'search_status': 'indexing',
+            'page_count': result['page_count']
+        })
 
     except Exception as e:
         import traceback
@@ -102,7 +232,117 @@ def convert():
         }), 500
 
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue PDF conversion, returns job ID immediately"""
+    if 'pdf' not in request.files:
+        return jsonify({'error': 'PDF file is required'}), 400
+
+    params = {
+        'title': request.form.get('title', 'Zpravodaj'),
+        'account': request.form.get('account', 'default'),
+        'profile': request.form.get('profile', DEFAULT_PROFILE)
+    }
+
+    if params['profile'] not in PROFILES:
+        return jsonify({'error': f"Unknown profile '{params['profile']}', expected one of: {', '.join(PROFILES)}"}), 400
+
+    job_id = job_store.create(params, request.files['pdf'].read())
+
+    # SQLite jobs run in this process, Postgres jobs are pulled by worker.py processes
+    if job_store.local_workers:
+        job_workers.notify()
+
+    return jsonify({
+        'id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}',
+        'events_url': f'/api/jobs/{job_id}/events',
+        'result_url': f'/api/jobs/{job_id}/result'
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report job status, stage and per-page progress"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream job progress as Server-Sent Events
+
+    Events: 'progress' on every stage/page change, then 'done' or 'failed'
+    (not 'error' - that name is taken by EventSource connection errors).
+    Data is the same JSON as GET /api/jobs/<id>.
+    """
+    if job_store.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def stream():
+        # Reconnect quickly if the connection drops
+        yield 'retry: 2000\n\n'
+
+        last_state = None
+        idle = 0.0
+        deadline = time.monotonic() + EVENTS_MAX_DURATION
+        while time.monotonic() < deadline:
+            job = job_store.get(job_id)
+            if job is None:
+                # Job was deleted while streaming
+                data = {'id': job_id, 'status': 'error', 'error': 'Job not found'}
+                yield f"event: failed\ndata: {json.dumps(data)}\n\n"
+                return
+
+            state = (job['status'], job['stage'], job['progress']['done'], job['progress']['total'])
+
+            if state != last_state:
+                last_state = state
+                idle = 0.0
+                event = {'done': 'done', 'error': 'failed'}.get(job['status'], 'progress')
+                yield f"event: {event}\ndata: {json.dumps(job)}\n\n"
+                if event != 'progress':
+                    return
+            elif idle >= EVENTS_KEEPALIVE:
+                # Comment line keeps proxies from closing an idle connection
+                idle = 0.0
+                yield ': keep-alive\n\n'
+
+            time.sleep(EVENTS_POLL_INTERVAL)
+            idle += EVENTS_POLL_INTERVAL
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+    })
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Download flipbook ZIP of a finished job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] == 'error':
+        return jsonify({'error': job['error'], 'status': job['status']}), 500
+
+    if job['status'] != 'done':
+        return jsonify({'error': 'Job is not finished yet', 'status': job['status'], 'stage': job['stage']}), 409
+
+    return send_file(
+        job_store.open_result(job_id),
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=job['result']['filename']
+    )
+
+
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
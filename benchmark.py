@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the PDF -> flipbook image pipeline
+Measures per-page cost of the alternatives used in lib/pdf_converter.py
+
+Usage: python benchmark.py <pdf> [repeat]
+"""
+
+import io
+import sys
+import time
+import fitz  # PyMuPDF
+from PIL import Image
+
+from lib.pdf_converter import PDFToFlipbook, PROFILES, DEFAULT_PROFILE, ENCODERS
+
+
+THUMB_SIZE = PROFILES[DEFAULT_PROFILE]['thumb_size']
+JPEG_QUALITY = PROFILES[DEFAULT_PROFILE]['jpeg_quality']
+
+
+def _timeit(func, repeat):
+    """Return average run time of func in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_thumbnails(pdf_document, repeat):
+    """Compare thumbnail strategies per page"""
+    converter = PDFToFlipbook(b'')
+    totals = {'lanczos-copy': 0.0, 'reduce': 0.0, 'fitz-render': 0.0}
+
+    for page in pdf_document:
+        pix = page.get_pixmap(matrix=fitz.Matrix(150/72, 150/72), alpha=False)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+        def lanczos_copy():
+            thumb = img.copy()
+            thumb.thumbnail(THUMB_SIZE, Image.Resampling.LANCZOS)
+            thumb.save(io.BytesIO(), 'JPEG', quality=75)
+
+        def fitz_render():
+            zoom = min(THUMB_SIZE[0] / page.rect.width, THUMB_SIZE[1] / page.rect.height)
+            thumb_pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            thumb_pix.tobytes('jpeg', jpg_quality=75)
+
+        totals['lanczos-copy'] += _timeit(lanczos_copy, repeat)
+        totals['reduce'] += _timeit(lambda: converter._make_thumbnail(img), repeat)
+        totals['fitz-render'] += _timeit(fitz_render, repeat)
+
+    return totals
+
+
+def bench_encoders(pdf_document, repeat):
+    """Compare full-page JPEG encoding paths per page"""
+    converters = {name: PDFToFlipbook(b'', encoder=name) for name in ENCODERS}
+    totals = {'frombytes-copy': 0.0}
+    totals.update({name: 0.0 for name in ENCODERS})
+    sizes = dict.fromkeys(totals, 0)
+
+    for page in pdf_document:
+        pix = page.get_pixmap(matrix=fitz.Matrix(150/72, 150/72), alpha=False)
+
+        def frombytes_copy():
+            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+            page_bytes = io.BytesIO()
+            img.save(page_bytes, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+            return page_bytes.getvalue()
+
+        totals['frombytes-copy'] += _timeit(frombytes_copy, repeat)
+        sizes['frombytes-copy'] += len(frombytes_copy())
+
+        for name, converter in converters.items():
+            def encode():
+                return converter._encode_page(pix, converter._pixmap_to_image(pix), JPEG_QUALITY)
+
+            totals[name] += _timeit(encode, repeat)
+            sizes[name] += len(encode())
+
+    return totals, sizes
+
+
+def main():
+    """CLI entry point"""
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark.py <pdf> [repeat]")
+        sys.exit(1)
+
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    pdf_document = fitz.open(sys.argv[1])
+    page_count = len(pdf_document)
+
+    print(f"{page_count} pages, {repeat} runs each\n")
+
+    print("Thumbnails (ms per page):")
+    for name, total in bench_thumbnails(pdf_document, repeat).items():
+        print(f"  {name:<14} {total / page_count:8.2f}")
+
+    print("\nPage encoders (ms per page, total KB):")
+    totals, sizes = bench_encoders(pdf_document, repeat)
+    for name, total in totals.items():
+        print(f"  {name:<14} {total / page_count:8.2f} {sizes[name] // 1024:8d}")
+
+    pdf_document.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,7 @@ pip install -r requirements-lambda.txt -t lambda-package/ --platform manylinux20
 echo "Copying application code..."
 cp lambda_handler.py lambda-package/
 cp -r lib lambda-package/
+cp -r static lambda-package/  # JS libraries bundled into every flipbook
 
 # Create ZIP package
 echo "Creating ZIP package..."
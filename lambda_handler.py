@@ -6,8 +6,8 @@ Handles PDF uploads and returns flipbook ZIP
 import json
 import base64
 import io
-import zipfile
-from lib.pdf_converter import PDFToFlipbook
+from lib.pdf_converter import PDFToFlipbook, PROFILES, DEFAULT_PROFILE
+from lib.packaging import safe_name, write_flipbook_zip
 
 
 def lambda_handler(event, context):
@@ -19,7 +19,8 @@ def lambda_handler(event, context):
         "body": "<base64-encoded-pdf>",
         "isBase64Encoded": true,
         "queryStringParameters": {
-            "title": "Zpravodaj název"
+            "title": "Zpravodaj název",
+            "profile": "balanced"
         }
     }
     """
@@ -32,52 +33,42 @@ def lambda_handler(event, context):
             # For testing with binary data
             pdf_bytes = event['body']
 
-        # Get title from query params
+        # Get title and conversion profile from query params
         params = event.get('queryStringParameters') or {}
         title = params.get('title', 'Zpravodaj')
+        profile = params.get('profile', DEFAULT_PROFILE)
 
-        print(f"Processing PDF: {title}, size: {len(pdf_bytes)} bytes")
+        if profile not in PROFILES:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': f"Unknown profile '{profile}', expected one of: {', '.join(PROFILES)}"})
+            }
+
+        print(f"Processing PDF: {title}, profile: {profile}, size: {len(pdf_bytes)} bytes")
 
         # Convert PDF to flipbook
-        converter = PDFToFlipbook(pdf_bytes, title)
+        converter = PDFToFlipbook(pdf_bytes, title, profile=profile)
         result = converter.convert()
 
         print(f"Conversion complete: {result['page_count']} pages")
 
-        # Create ZIP file in memory
+        safe_title = safe_name(title)
+        # Create ZIP file in memory - without the original PDF (the client has it),
+        # the base64 response must fit the 6 MB Lambda limit
         zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Add HTML
-            zip_file.writestr('index.html', result['html'])
-
-            # Add CSS
-            zip_file.writestr('css/style.css', result['css'])
-
-            # Add JS
-            zip_file.writestr('js/flipbook.js', result['js'])
-
-            # Add page images
-            for i, page_bytes in enumerate(result['pages'], start=1):
-                zip_file.writestr(f'files/pages/{i}.jpg', page_bytes)
-
-            # Add thumbnails
-            for i, thumb_bytes in enumerate(result['thumbs'], start=1):
-                zip_file.writestr(f'files/thumb/{i}.jpg', thumb_bytes)
-
-            # Add search data
-            zip_file.writestr('search_data.json', result['search_data'])
-
-        # Get ZIP bytes
-        zip_buffer.seek(0)
-        zip_bytes = zip_buffer.read()
+        write_flipbook_zip(result, safe_title, zip_buffer, include_pdf=False)
+        zip_bytes = zip_buffer.getvalue()
 
         # Return as base64-encoded response
         return {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/zip',
-                'Content-Disposition': f'attachment; filename="{title}-flipbook.zip"',
+                'Content-Disposition': f'attachment; filename="{safe_title}-flipbook.zip"',
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Headers': 'Content-Type',
                 'Access-Control-Allow-Methods': 'POST, OPTIONS'
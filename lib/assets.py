@@ -0,0 +1,249 @@
+"""
+Shared flipbook assets - CSS, viewer JS and JS libraries
+
+registry() builds them once per process: bytes, content hash, MIME type
+and gzip/brotli variants of each. Packaging, uploads and local publishing
+all read from it, nothing is re-read from static/ or re-compressed per
+conversion.
+
+They are identical for every flipbook, so published flipbooks don't get
+their own copies: the assets are written once under assets/ (next to the
+account folders) with the content hash in the file name, e.g.
+assets/flipbook.3f2a1b9c.js, and index.html points there. A changed file
+gets a new name, so browsers can keep cached copies across issues.
+Offline ZIPs still bundle their own copies (see packaging.flipbook_files).
+
+Page images and thumbnails are content-hashed the same way
+(files/pages/1.3f2a1b9c.jpg), so everything except index.html, the
+manifest, search data and the PDF can be cached forever (cache_control).
+
+Text files (HTML, CSS, JS, JSON) are precompressed when published
+(precompressed) - S3 gets the gzip body with Content-Encoding, local
+folders get .gz / .br siblings the Flask app serves by Accept-Encoding.
+"""
+
+import re
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # .br variants are skipped, gzip is always available
+
+STATIC_DIR = Path(__file__).parent.parent / 'static'
+
+# JS libraries bundled with every flipbook (path in flipbook -> local file)
+LIBRARIES = {
+    'js/jquery-3.6.0.min.js': STATIC_DIR / 'jquery-3.6.0.min.js',
+    'js/turn.min.js': STATIC_DIR / 'turn.min.js',
+    'js/qrcode.min.js': STATIC_DIR / 'qrcode.min.js'
+}
+
+# Folder of shared assets, relative to the root of published flipbooks
+ASSETS_DIR = 'assets'
+
+# Hex digits of the content hash in file names
+HASH_LENGTH = 8
+
+# Cache-Control of content-hashed files (never change under their name) and of the rest
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_SHORT = 'public, max-age=60'
+
+# Content-hashed files are only those hashed_name() wrote - page images,
+# thumbnails and sprites of a flipbook, shared assets in the root ASSETS_DIR.
+# A user's "report.deadbeef.pdf" must not be cached for a year.
+_HASHED_FILE = r'[^/]+\.[0-9a-f]{%d}\.[A-Za-z0-9]+$' % HASH_LENGTH
+_HASHED_PATH = re.compile(r'(^|/)files/(pages|thumb)/%s|^%s/%s' % (_HASHED_FILE, ASSETS_DIR, _HASHED_FILE))
+
+# Content types worth compressing (JPEGs and PDFs are compressed already)
+COMPRESSIBLE_TYPES = ('text/html', 'text/css', 'application/javascript', 'application/json')
+
+# Smaller files gain nothing from compression
+COMPRESS_MIN_SIZE = 1024
+
+# Content-Encoding -> file suffix of the precompressed variant
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+_registry = None
+_registry_by_path = {}
+_registry_lock = threading.Lock()
+
+
+class StaticAsset:
+    def __init__(self, path, data, content_type):
+        """
+        One shared asset, hashed and compressed up front
+
+        Args:
+            path: Logical path as in a bundled flipbook (e.g. "js/flipbook.js")
+            data: File content (bytes)
+            content_type: MIME type
+        """
+        self.path = path
+        self.data = data
+        self.content_type = content_type
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.name = hashed_name(path, data)  # File name in ASSETS_DIR
+        self.variants = _compress(data, content_type)  # Content-Encoding -> bytes
+
+
+def hashed_name(path, data):
+    """
+    File name with content hash
+
+    Args:
+        path: Logical path (e.g. "js/flipbook.js")
+        data: File content
+
+    Returns:
+        Name like "flipbook.3f2a1b9c.js"
+    """
+    name = Path(path)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f"{name.stem}.{digest}{name.suffix}"
+
+
+def page_paths(page_num, page_bytes, thumb_bytes):
+    """
+    Content-hashed paths of a page image and its thumbnail
+
+    Returns:
+        Tuple ("files/pages/1.<hash>.jpg", "files/thumb/1.<hash>.jpg")
+    """
+    return (
+        f"files/pages/{hashed_name(f'{page_num}.jpg', page_bytes)}",
+        f"files/thumb/{hashed_name(f'{page_num}.jpg', thumb_bytes)}"
+    )
+
+
+def cache_control(path):
+    """
+    Cache-Control header for a published file
+
+    Args:
+        path: Path relative to the published root (S3 key, path under
+            FLIPBOOKS_DIR) - "account/book/files/pages/1.<hash>.jpg",
+            "assets/flipbook.<hash>.js"
+
+    Returns:
+        CACHE_IMMUTABLE for content-hashed pages and shared assets, CACHE_SHORT otherwise
+    """
+    return CACHE_IMMUTABLE if _HASHED_PATH.search(path) else CACHE_SHORT
+
+
+def precompressed(path, data, content_type):
+    """
+    Compressed variants of a text file
+
+    Gzip is written without a timestamp, so the same content always gives
+    the same bytes (and S3 ETag). Shared assets (bundled or under their
+    hashed name) come precompressed from the registry.
+
+    Args:
+        path: File path or key
+        data: File content
+        content_type: MIME type
+
+    Returns:
+        Dict Content-Encoding ('gzip', 'br') -> bytes, empty if not worth compressing
+    """
+    asset = registry_by_path().get(path)
+    if asset is not None and (asset.data is data or asset.data == data):
+        return asset.variants
+    return _compress(data, content_type)
+
+
+def _compress(data, content_type):
+    """Gzip (and brotli, if installed) variants of a compressible file"""
+    if content_type not in COMPRESSIBLE_TYPES or len(data) < COMPRESS_MIN_SIZE:
+        return {}
+
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, mode=brotli.MODE_TEXT)
+    return variants
+
+
+def registry():
+    """
+    Get shared assets (built once, on first use - warm it up at startup)
+
+    Returns:
+        Dict logical path (as in the bundled flipbook) -> StaticAsset
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                # Imported here - the converter itself uses this module
+                from lib.pdf_converter import PDFToFlipbook
+
+                converter = PDFToFlipbook(b'')
+                files = [
+                    ('css/style.css', converter._get_css().encode('utf-8'), 'text/css'),
+                    ('js/flipbook.js', converter._get_js().encode('utf-8'), 'application/javascript')
+                ]
+                files += [(path, file_path.read_bytes(), 'application/javascript') for path, file_path in LIBRARIES.items()]
+
+                assets = {path: StaticAsset(path, data, content_type) for path, data, content_type in files}
+                for asset in assets.values():
+                    _registry_by_path[asset.path] = asset
+                    _registry_by_path[asset.name] = asset
+                _registry = assets
+
+    return _registry
+
+
+def registry_by_path():
+    """
+    Shared assets by logical path and by hashed name
+
+    Returns:
+        Dict path -> StaticAsset
+    """
+    registry()
+    return _registry_by_path
+
+
+def asset_urls(base_url):
+    """
+    URLs of shared assets for index.html (PDFToFlipbook.convert asset_urls)
+
+    Args:
+        base_url: Root of published flipbooks, relative to the flipbook
+            folder (e.g. "../../") or absolute
+
+    Returns:
+        Dict logical path -> URL
+    """
+    return {path: f"{base_url}{ASSETS_DIR}/{asset.name}" for path, asset in registry().items()}
+
+
+def relative_root(folder):
+    """
+    Relative URL from a flipbook folder back to the publishing root
+
+    Args:
+        folder: Flipbook folder (e.g. "account/zpravodaj-1a2b3c4d")
+
+    Returns:
+        e.g. "../../"
+    """
+    return '../' * (folder.strip('/').count('/') + 1)
+
+
+def asset_files(bundled=False):
+    """
+    Shared assets as files for a sink
+
+    Args:
+        bundled: Use logical paths (copies inside a flipbook folder)
+            instead of hashed names (sink rooted at ASSETS_DIR)
+
+    Returns:
+        List of tuples (path, bytes, content type)
+    """
+    return [(path if bundled else asset.name, asset.data, asset.content_type) for path, asset in registry().items()]
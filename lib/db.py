@@ -56,6 +56,49 @@ def init_db():
         ON conversions(created_at DESC)
     ''')
 
+    # Create conversion job queue (see lib/jobs.py PostgresJobStore)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id VARCHAR(32) PRIMARY KEY,
+            status VARCHAR(20) NOT NULL,
+            stage VARCHAR(50),
+            done INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            stage_started_at TIMESTAMP,
+            params JSONB NOT NULL,
+            result JSONB,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            lease_owner VARCHAR(255),
+            lease_expires_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tables created before progress ETA was added
+    cur.execute('''
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS stage_started_at TIMESTAMP
+    ''')
+
+    # Create index for claiming the next runnable job
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_jobs_claim
+        ON jobs(status, run_after, created_at)
+    ''')
+
+    # Uploaded PDFs and result ZIPs, kept apart so status polling stays cheap
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS job_files (
+            job_id VARCHAR(32) NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+            name VARCHAR(50) NOT NULL,
+            data BYTEA NOT NULL,
+            PRIMARY KEY (job_id, name)
+        )
+    ''')
+
     conn.commit()
     cur.close()
     conn.close()
@@ -0,0 +1,696 @@
+"""
+Asynchronous conversion jobs
+
+POST /api/jobs stores the PDF and a 'queued' job, worker threads (decoupled
+from request threads) claim jobs from the store, convert them and record
+stage / per-page progress and the result.
+
+The default store is SQLite - shared by all gunicorn workers on one machine,
+every process runs its own worker threads and claims jobs atomically. Jobs of
+a process that died are picked up again once their lease expires.
+
+With JOB_BACKEND=postgres jobs live in the Neon database (lib/db.py) and any
+number of `python worker.py` processes on any number of nodes pull them.
+Workers claim jobs with FOR UPDATE SKIP LOCKED and hold a lease they renew by
+heartbeat; jobs of dead workers are picked up again once the lease expires,
+failed jobs are retried with exponential backoff.
+"""
+
+import io
+import os
+import json
+import time
+import uuid
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+from lib.pdf_converter import PDFToFlipbook
+from lib.packaging import safe_name, write_flipbook_zip
+
+# Job store: 'sqlite' (single machine) or 'postgres' (distributed workers)
+JOB_BACKEND = os.environ.get('JOB_BACKEND', 'sqlite')
+
+# Job files (uploaded PDF, result ZIP) and SQLite database
+JOBS_DIR = Path(os.environ.get('JOBS_DIR', 'jobs')).resolve()
+
+# Worker threads per process
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+
+# How often idle workers look for new jobs (seconds)
+POLL_INTERVAL = 2.0
+
+# Leases - a worker that misses heartbeats for LEASE_SECONDS is considered dead
+LEASE_SECONDS = 120
+HEARTBEAT_INTERVAL = 30
+
+# Attempts per job (both stores) and Postgres backoff between them (seconds)
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 600
+
+
+def _progress(done, total, stage_started_at, updated_at):
+    """
+    Build progress dict of a job
+
+    The ETA extrapolates the average time per item of the current stage
+    (render / OCR pages, packaged or uploaded files) to the remaining items.
+
+    Returns:
+        Dict with 'done', 'total' and 'eta_seconds' (None until known)
+    """
+    eta = None
+    if stage_started_at is not None and 0 < done < total:
+        elapsed = float(updated_at) - float(stage_started_at)
+        eta = round(elapsed / done * (total - done), 1)
+
+    return {'done': done, 'total': total, 'eta_seconds': eta}
+
+
+class SQLiteJobStore:
+    # Jobs run in worker threads of the web processes
+    local_workers = True
+
+    def __init__(self, db_path=None):
+        """
+        Initialize SQLite job store
+
+        Args:
+            db_path: Database file (default JOBS_DIR/jobs.sqlite3)
+        """
+        JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(db_path or JOBS_DIR / 'jobs.sqlite3')
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    stage_started_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    params TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)')
+
+            # Databases created before progress ETA and leases were added
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(jobs)')]
+            for column, definition in (
+                ('stage_started_at', 'REAL'),
+                ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+                ('lease_owner', 'TEXT'),
+                ('lease_expires_at', 'REAL')
+            ):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {definition}')
+
+    def _connect(self):
+        """New connection per operation - safe across threads and processes"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, params, pdf_bytes):
+        """
+        Store PDF and queue a new job
+
+        Args:
+            params: Dict with 'title', 'account', 'profile'
+            pdf_bytes: Uploaded PDF
+
+        Returns:
+            Job ID
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = JOBS_DIR / job_id
+        job_dir.mkdir(parents=True)
+        (job_dir / 'input.pdf').write_bytes(pdf_bytes)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO jobs (id, status, stage, params, created_at, updated_at)
+                VALUES (?, 'queued', 'queued', ?, ?, ?)
+            ''', (job_id, json.dumps(params), now, now))
+
+        return job_id
+
+    def load_pdf(self, job_id):
+        """Return uploaded PDF bytes of a job"""
+        return (JOBS_DIR / job_id / 'input.pdf').read_bytes()
+
+    def result_path(self, job_id):
+        """Return path of the result ZIP of a job"""
+        return JOBS_DIR / job_id / 'result.zip'
+
+    def save_result(self, job_id, fileobj, worker_id=None):
+        """
+        Store result ZIP of a job (only while holding the lease)
+
+        The ZIP is written to a temporary file and moved into place under the
+        database write lock, so a worker whose lease expired cannot replace
+        the result of the attempt that took the job over.
+
+        Returns:
+            False if the lease was lost and the result discarded
+        """
+        path = self.result_path(job_id)
+        tmp_path = path.with_name(f'result.{uuid.uuid4().hex}.tmp')
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('''
+                SELECT 1 FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'running'
+            ''', (job_id, worker_id)).fetchone()
+            if row is not None:
+                os.replace(tmp_path, path)
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        return row is not None
+
+    def open_result(self, job_id):
+        """Return result ZIP of a job (path for send_file)"""
+        return self.result_path(job_id)
+
+    def claim(self, worker_id):
+        """
+        Claim the oldest queued job, or a running job whose lease expired
+        (its process died), and take a lease on it
+
+        Args:
+            worker_id: Unique worker name, owner of the lease
+
+        Returns:
+            Job dict, or None if there is nothing to do
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Dead worker on the last attempt - give up on the job
+            conn.execute('''
+                UPDATE jobs SET status = 'error', lease_owner = NULL, updated_at = ?,
+                    error = COALESCE(error, 'Worker stopped responding')
+                WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?
+            ''', (now, now, MAX_ATTEMPTS))
+
+            row = conn.execute('''
+                SELECT id FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?)
+                ORDER BY created_at LIMIT 1
+            ''', (now,)).fetchone()
+            if row is None:
+                return None
+
+            # Another worker may have been faster - the status check makes the claim atomic
+            cur = conn.execute('''
+                UPDATE jobs SET status = 'running', stage = 'starting', done = 0, total = 0,
+                    stage_started_at = ?, attempts = attempts + 1, lease_owner = ?,
+                    lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND (status = 'queued' OR (status = 'running' AND lease_expires_at < ?))
+            ''', (now, worker_id, now + LEASE_SECONDS, now, row['id'], now))
+            if cur.rowcount == 0:
+                return None
+
+        return self.get(row['id'])
+
+    def update_progress(self, job_id, stage, done, total):
+        """Record current stage and page progress (stage start time drives the ETA)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('''
+                UPDATE jobs SET stage = ?, done = ?, total = ?, updated_at = ?,
+                    stage_started_at = CASE WHEN stage = ? THEN stage_started_at ELSE ? END
+                WHERE id = ?
+            ''', (stage, done, total, now, stage, now, job_id))
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Extend lease of a running job
+
+        Returns:
+            False if the lease was lost (expired and claimed by another worker)
+        """
+        with self._connect() as conn:
+            cur = conn.execute('''
+                UPDATE jobs SET lease_expires_at = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+            ''', (time.time() + LEASE_SECONDS, job_id, worker_id))
+            return cur.rowcount > 0
+
+    def complete(self, job_id, result, worker_id=None):
+        """Mark job as done with result dict (only while holding the lease)"""
+        with self._connect() as conn:
+            cur = conn.execute('''
+                UPDATE jobs SET status = 'done', stage = 'done', result = ?, error = NULL,
+                    lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+            ''', (json.dumps(result), time.time(), job_id, worker_id))
+
+        if cur.rowcount == 0:
+            print(f"  WARNING: job {job_id} lease lost, result of {worker_id} discarded")
+
+    def fail(self, job_id, error, worker_id=None):
+        """Mark job as failed (only while holding the lease)"""
+        with self._connect() as conn:
+            cur = conn.execute('''
+                UPDATE jobs SET status = 'error', error = ?,
+                    lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+            ''', (error, time.time(), job_id, worker_id))
+
+        if cur.rowcount == 0:
+            print(f"  WARNING: job {job_id} lease lost, failure of {worker_id} discarded")
+
+    def get(self, job_id):
+        """
+        Get job by ID
+
+        Returns:
+            Job dict, or None if not found
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'id': row['id'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'progress': _progress(row['done'], row['total'], row['stage_started_at'], row['updated_at']),
+            'params': json.loads(row['params']),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+
+
+class PostgresJobStore:
+    # Jobs are pulled by worker.py processes, possibly on other nodes
+    local_workers = False
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS):
+        """
+        Initialize Postgres job store (tables are created by lib.db.init_db)
+
+        Args:
+            max_attempts: Attempts per job before it is marked as failed
+        """
+        # Imported here so the SQLite backend works without DATABASE_URL
+        from lib.db import get_db_connection
+        self._connect = get_db_connection
+        self.max_attempts = max_attempts
+
+    def _execute(self, query, params=(), fetch=None):
+        """
+        Run one statement in its own transaction
+
+        Args:
+            query: SQL statement
+            params: Query parameters
+            fetch: None, 'one' or 'rowcount'
+
+        Returns:
+            Fetched row, row count or None
+        """
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            if fetch == 'one':
+                value = cur.fetchone()
+            elif fetch == 'rowcount':
+                value = cur.rowcount
+            else:
+                value = None
+            conn.commit()
+            cur.close()
+            return value
+        finally:
+            conn.close()
+
+    def create(self, params, pdf_bytes):
+        """
+        Store PDF and queue a new job
+
+        Args:
+            params: Dict with 'title', 'account', 'profile'
+            pdf_bytes: Uploaded PDF
+
+        Returns:
+            Job ID
+        """
+        import psycopg2
+
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute('''
+                INSERT INTO jobs (id, status, stage, params, max_attempts)
+                VALUES (%s, 'queued', 'queued', %s, %s)
+            ''', (job_id, json.dumps(params), self.max_attempts))
+            cur.execute('''
+                INSERT INTO job_files (job_id, name, data) VALUES (%s, 'input.pdf', %s)
+            ''', (job_id, psycopg2.Binary(pdf_bytes)))
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
+
+        return job_id
+
+    def _load_file(self, job_id, name):
+        """Return stored file of a job, or None"""
+        row = self._execute('''
+            SELECT data FROM job_files WHERE job_id = %s AND name = %s
+        ''', (job_id, name), fetch='one')
+        return bytes(row['data']) if row else None
+
+    def load_pdf(self, job_id):
+        """Return uploaded PDF bytes of a job"""
+        return self._load_file(job_id, 'input.pdf')
+
+    def save_result(self, job_id, fileobj, worker_id=None):
+        """
+        Store result ZIP of a job (only while holding the lease)
+
+        The job row stays locked until the write commits, so a worker whose
+        lease expired cannot replace the result of the attempt that took the
+        job over.
+
+        Returns:
+            False if the lease was lost and the result discarded
+        """
+        import psycopg2
+
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute('''
+                SELECT 1 FROM jobs WHERE id = %s AND lease_owner = %s AND status = 'running'
+                FOR UPDATE
+            ''', (job_id, worker_id))
+            saved = cur.fetchone() is not None
+            if saved:
+                cur.execute('''
+                    INSERT INTO job_files (job_id, name, data) VALUES (%s, 'result.zip', %s)
+                    ON CONFLICT (job_id, name) DO UPDATE SET data = EXCLUDED.data
+                ''', (job_id, psycopg2.Binary(fileobj.read())))
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
+
+        return saved
+
+    def open_result(self, job_id):
+        """Return result ZIP of a job (file object for send_file)"""
+        return io.BytesIO(self._load_file(job_id, 'result.zip'))
+
+    def claim(self, worker_id):
+        """
+        Claim the oldest runnable job and take a lease on it
+
+        Runnable are queued jobs past their retry delay and running jobs whose
+        lease expired (worker died). SKIP LOCKED lets concurrent workers pass
+        over rows another worker is claiming instead of waiting for them.
+
+        Args:
+            worker_id: Unique worker name, owner of the lease
+
+        Returns:
+            Job dict, or None if there is nothing to do
+        """
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+
+            # Dead worker on the last attempt - give up on the job
+            cur.execute('''
+                UPDATE jobs SET status = 'error', lease_owner = NULL, updated_at = now(),
+                    error = COALESCE(error, 'Worker stopped responding')
+                WHERE status = 'running' AND lease_expires_at < now()
+                    AND attempts >= max_attempts
+            ''')
+
+            cur.execute('''
+                UPDATE jobs SET status = 'running', stage = 'starting', done = 0, total = 0,
+                    stage_started_at = now(), attempts = attempts + 1, lease_owner = %s,
+                    lease_expires_at = now() + %s * interval '1 second',
+                    updated_at = now()
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE (status = 'queued' AND run_after <= now())
+                        OR (status = 'running' AND lease_expires_at < now())
+                    ORDER BY created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id
+            ''', (worker_id, LEASE_SECONDS))
+            row = cur.fetchone()
+
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+
+        return self.get(row['id'])
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Extend lease of a running job
+
+        Returns:
+            False if the lease was lost (expired and claimed by another worker)
+        """
+        return self._execute('''
+            UPDATE jobs SET lease_expires_at = now() + %s * interval '1 second'
+            WHERE id = %s AND lease_owner = %s AND status = 'running'
+        ''', (LEASE_SECONDS, job_id, worker_id), fetch='rowcount') > 0
+
+    def update_progress(self, job_id, stage, done, total):
+        """Record current stage and page progress (stage start time drives the ETA)"""
+        self._execute('''
+            UPDATE jobs SET stage = %s, done = %s, total = %s, updated_at = now(),
+                stage_started_at = CASE WHEN stage = %s THEN stage_started_at ELSE now() END
+            WHERE id = %s
+        ''', (stage, done, total, stage, job_id))
+
+    def complete(self, job_id, result, worker_id=None):
+        """Mark job as done with result dict (only while holding the lease)"""
+        updated = self._execute('''
+            UPDATE jobs SET status = 'done', stage = 'done', result = %s, error = NULL,
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = now()
+            WHERE id = %s AND lease_owner = %s
+        ''', (json.dumps(result), job_id, worker_id), fetch='rowcount')
+
+        if not updated:
+            print(f"  WARNING: job {job_id} lease lost, result of {worker_id} discarded")
+
+    def fail(self, job_id, error, worker_id=None):
+        """
+        Record failed attempt - requeue with exponential backoff, or mark as
+        failed once attempts are used up
+        """
+        updated = self._execute('''
+            UPDATE jobs SET
+                status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'error' END,
+                run_after = now() + LEAST(%s * power(2, attempts - 1), %s) * interval '1 second',
+                error = %s, lease_owner = NULL, lease_expires_at = NULL, updated_at = now()
+            WHERE id = %s AND lease_owner = %s
+        ''', (RETRY_BASE_DELAY, RETRY_MAX_DELAY, error, job_id, worker_id), fetch='rowcount')
+
+        if not updated:
+            print(f"  WARNING: job {job_id} lease lost, failure of {worker_id} discarded")
+
+    def get(self, job_id):
+        """
+        Get job by ID
+
+        Returns:
+            Job dict, or None if not found
+        """
+        row = self._execute('''
+            SELECT id, status, stage, done, total, params, result, error, attempts,
+                EXTRACT(EPOCH FROM stage_started_at) AS stage_started_at,
+                EXTRACT(EPOCH FROM created_at) AS created_at,
+                EXTRACT(EPOCH FROM updated_at) AS updated_at
+            FROM jobs WHERE id = %s
+        ''', (job_id,), fetch='one')
+
+        if row is None:
+            return None
+
+        # psycopg2 decodes JSONB columns already
+        return {
+            'id': row['id'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'progress': _progress(row['done'], row['total'], row['stage_started_at'], row['updated_at']),
+            'params': row['params'],
+            'result': row['result'],
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'created_at': float(row['created_at']),
+            'updated_at': float(row['updated_at'])
+        }
+
+
+def create_job_store():
+    """
+    Create job store selected by JOB_BACKEND
+
+    Returns:
+        SQLiteJobStore or PostgresJobStore
+    """
+    if JOB_BACKEND == 'postgres':
+        return PostgresJobStore()
+    if JOB_BACKEND == 'sqlite':
+        return SQLiteJobStore()
+    raise ValueError(f"Unknown JOB_BACKEND '{JOB_BACKEND}', expected 'sqlite' or 'postgres'")
+
+
+def _heartbeat(store, job_id, worker_id, stop):
+    """Renew lease of a running job until stop is set"""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        try:
+            if not store.heartbeat(job_id, worker_id):
+                print(f"  WARNING: job {job_id} lease lost by {worker_id}")
+                return
+        except Exception as e:
+            # Transient DB error - keep trying, the lease covers a few missed beats
+            print(f"  WARNING: heartbeat for job {job_id} failed: {e}")
+
+
+def run_job(store, job, worker_id=None):
+    """
+    Convert one claimed job and store its result
+
+    Args:
+        store: Job store
+        job: Job dict from store.claim()
+        worker_id: Worker holding the job lease
+    """
+    job_id = job['id']
+    params = job['params']
+
+    def progress(stage, done, total):
+        store.update_progress(job_id, stage, done, total)
+
+    stop_heartbeat = threading.Event()
+    threading.Thread(
+        target=_heartbeat, args=(store, job_id, worker_id, stop_heartbeat), daemon=True
+    ).start()
+
+    try:
+        pdf_bytes = store.load_pdf(job_id)
+        converter = PDFToFlipbook(pdf_bytes, params['title'], profile=params['profile'], progress=progress)
+        result = converter.convert()
+
+        # Package as offline ZIP
+        safe_title = safe_name(params['title'])
+        with tempfile.TemporaryFile() as f:
+            write_flipbook_zip(result, safe_title, f, progress=progress)
+
+            # Store result where the API can serve it
+            progress('upload', 0, 1)
+            f.seek(0)
+            if not store.save_result(job_id, f, worker_id):
+                print(f"  WARNING: job {job_id} lease lost, result of {worker_id} discarded")
+                return
+            progress('upload', 1, 1)
+
+        store.complete(job_id, {
+            'page_count': result['page_count'],
+            'filename': f"{safe_title}-flipbook.zip"
+        }, worker_id)
+        print(f"Job {job_id} done: {result['page_count']} pages")
+
+    except Exception as e:
+        import traceback
+        print(f"Error: job {job_id} failed: {traceback.format_exc()}")
+        store.fail(job_id, str(e), worker_id)
+
+    finally:
+        stop_heartbeat.set()
+
+
+class JobWorkers:
+    def __init__(self, store, count=JOB_WORKERS):
+        """
+        Background worker threads pulling jobs from a store
+
+        Args:
+            store: Job store
+            count: Number of worker threads
+        """
+        self.store = store
+        self.count = count
+        self.wakeup = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start worker threads (once per process)"""
+        with self.lock:
+            if self.threads:
+                return
+            for n in range(self.count):
+                thread = threading.Thread(target=self._loop, name=f'job-worker-{n}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def notify(self):
+        """Wake idle workers - a job was just submitted"""
+        self.wakeup.set()
+
+    def run(self):
+        """Start worker threads and block (worker.py entry point)"""
+        self.start()
+        for thread in self.threads:
+            thread.join()
+
+    def _loop(self):
+        """Claim and run jobs forever"""
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+        while True:
+            try:
+                job = self.store.claim(worker_id)
+            except Exception as e:
+                print(f"  WARNING: claiming job failed: {e}")
+                job = None
+
+            if job is None:
+                self.wakeup.wait(POLL_INTERVAL)
+                self.wakeup.clear()
+                continue
+
+            run_job(self.store, job, worker_id)
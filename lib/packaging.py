@@ -0,0 +1,549 @@
+"""
+Flipbook packaging - turns PDFToFlipbook.convert() output into deliverable files
+
+flipbook_files() decides what a flipbook consists of, package() writes those
+files to a sink exactly once:
+    ZipSink        - ZIP into a file object (streamed with stream_flipbook_zip)
+    DirectorySink  - local folder (flipbooks published by the Flask app)
+    S3Sink         - S3 folder
+    MemorySink     - dict of path -> bytes
+Every entry point (Flask, Vercel, Lambda, jobs, CLI) goes through here, so all
+of them produce the same files.
+
+Published flipbooks (converted with lib.assets asset_urls) leave out CSS/JS,
+publish_shared_assets() writes those once for all flipbooks.
+"""
+
+import io
+import re
+import time
+import queue
+import zipfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from lib.assets import ENCODING_SUFFIXES, asset_files, page_paths, precompressed
+
+# Written after everything else when streaming - viewers treat them as "complete"
+WRITTEN_LAST = ('index.html', 'search_data.json')
+
+# Name of an account/title with nothing usable in it
+SAFE_NAME_DEFAULT = 'default'
+
+# Finished ZIP entries waiting for a slow client when streaming
+STREAM_QUEUE_ENTRIES = 16
+
+
+def safe_name(text):
+    """
+    Make title/account usable as file or folder name, S3 key and URL part
+
+    Diacritics are dropped (Frýdek -> frydek), every other character outside
+    [a-z0-9] becomes '-' - the same rule the viewer's "Download PDF" button
+    uses to find the bundled PDF.
+
+    Args:
+        text: Arbitrary user input
+
+    Returns:
+        Name of [a-z0-9-] only, SAFE_NAME_DEFAULT if no letter or digit is left
+    """
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    name = re.sub(r'[^a-z0-9]', '-', text.lower())
+    return name if re.search(r'[a-z0-9]', name) else SAFE_NAME_DEFAULT
+
+
+def flipbook_files(result, safe_title, include_pdf=True):
+    """
+    List all files of a flipbook
+
+    Args:
+        result: Dict from PDFToFlipbook.convert()
+        safe_title: Sanitized title (name of the bundled PDF)
+        include_pdf: Bundle the original PDF for download
+
+    Returns:
+        List of tuples (path in flipbook, bytes, content type)
+    """
+    files = [('index.html', result['html'].encode('utf-8'), 'text/html')]
+
+    # CSS, JS and JS libraries - own copies (from lib.assets registry) unless index.html uses shared assets
+    if not result['shared_assets']:
+        files += asset_files(bundled=True)
+
+    # Page images and thumbnails (content-hashed names, as referenced by index.html)
+    for (page_path, thumb_path), page_bytes, thumb_bytes in zip(result['page_paths'], result['pages'], result['thumbs']):
+        files.append((page_path, page_bytes, 'image/jpeg'))
+        files.append((thumb_path, thumb_bytes, 'image/jpeg'))
+
+    # Thumbnail sprite sheets used by the sidebar
+    for path, data in result['sprites']:
+        files.append((path, data, 'image/jpeg'))
+
+    # Search data (None while OCR is deferred - written later by the caller)
+    if result['search_data'] is not None:
+        files.append(('search_data.json', result['search_data'].encode('utf-8'), 'application/json'))
+
+    # Page manifest (blank/grayscale flags, pixel stats)
+    files.append(('manifest.json', result['manifest'].encode('utf-8'), 'application/json'))
+
+    # Original PDF for download
+    if include_pdf:
+        files.append((safe_title + '.pdf', result['pdf'], 'application/pdf'))
+
+    return files
+
+
+def package(result, sink, safe_title, progress=None, include_pdf=True):
+    """
+    Write complete flipbook to a sink and close it
+
+    Args:
+        result: Dict from PDFToFlipbook.convert()
+        sink: ZipSink, DirectorySink, S3Sink or MemorySink
+        safe_title: Sanitized title (name of the bundled PDF)
+        progress: Optional callback progress(sink.stage, done, total) per file
+        include_pdf: Bundle the original PDF for download
+    """
+    write_files(flipbook_files(result, safe_title, include_pdf), sink, progress)
+    sink.close()
+
+
+_published_assets = set()
+
+
+def publish_shared_assets(sink, target):
+    """
+    Write shared CSS/JS (lib.assets) to a sink rooted at the assets folder
+
+    Done once per target and process - names are content-hashed, so files
+    written earlier are still valid.
+
+    Args:
+        sink: Sink for the assets folder (e.g. DirectorySink(root / 'assets'))
+        target: Identifies the destination (e.g. bucket name or root folder)
+    """
+    if target in _published_assets:
+        return
+
+    write_files(asset_files(), sink)
+    sink.close()
+    _published_assets.add(target)
+
+
+def write_files(files, sink, progress=None):
+    """
+    Write files to a sink - in parallel if the sink allows it
+
+    Args:
+        files: List of tuples (path, bytes, content type)
+        sink: Target sink
+        progress: Optional callback progress(sink.stage, done, total) per file
+    """
+    total = len(files)
+
+    def report(done):
+        if progress:
+            progress(sink.stage, done, total)
+
+    report(0)
+
+    if sink.workers <= 1:
+        for done, (path, data, content_type) in enumerate(files, start=1):
+            sink.write(path, data, content_type)
+            report(done)
+        return
+
+    with ThreadPoolExecutor(max_workers=sink.workers) as executor:
+        futures = [executor.submit(sink.write, path, data, content_type) for path, data, content_type in files]
+        for done, future in enumerate(futures, start=1):
+            future.result()  # Re-raises the first failed write
+            report(done)
+
+
+class ZipSink:
+    # Entries are appended one after another
+    workers = 1
+    stage = 'package'
+
+    def __init__(self, fileobj):
+        """
+        ZIP archive sink
+
+        JPEGs are stored as-is (ZIP_STORED) - deflating them costs CPU and
+        saves nothing, text files and the PDF are deflated.
+
+        Args:
+            fileobj: Binary file object (or path), need not be seekable
+        """
+        self.zip_file = zipfile.ZipFile(fileobj, 'w')
+
+    def write(self, path, data, content_type):
+        """Add one file to the archive"""
+        compress_type = zipfile.ZIP_STORED if content_type == 'image/jpeg' else zipfile.ZIP_DEFLATED
+        self.zip_file.writestr(path, data, compress_type=compress_type)
+
+    def close(self):
+        """Write central directory"""
+        self.zip_file.close()
+
+
+class DirectorySink:
+    # Plain file writes, a few threads keep the disk busy
+    workers = 4
+    stage = 'package'
+
+    def __init__(self, directory, precompress=False):
+        """
+        Local directory sink
+
+        Args:
+            directory: Target folder (created if missing)
+            precompress: Also write .gz / .br variants of text files (served
+                by the Flask app to browsers that accept them)
+        """
+        self.directory = Path(directory)
+        self.precompress = precompress
+
+    def write(self, path, data, content_type):
+        """Write one file (atomically - readers never see a half-written file)"""
+        target = self.directory / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        # Variants first - the plain file appearing means all of them are there
+        if self.precompress:
+            for encoding, encoded in precompressed(path, data, content_type).items():
+                self._write_atomic(target.with_name(target.name + ENCODING_SUFFIXES[encoding]), encoded)
+
+        self._write_atomic(target, data)
+
+    def _write_atomic(self, target, data):
+        """Write via a temporary file and rename"""
+        tmp_path = target.with_name(target.name + '.tmp')
+        tmp_path.write_bytes(data)
+        tmp_path.replace(target)
+
+    def close(self):
+        """Nothing to finalize"""
+
+
+class S3Sink:
+    stage = 'upload'
+
+    def __init__(self, uploader, folder_name):
+        """
+        S3 folder sink - network bound, uploads run in parallel (uploader.workers)
+
+        Args:
+            uploader: lib.s3_uploader.S3Uploader
+            folder_name: Base folder path (e.g., "account/zpravodaj-123")
+        """
+        self.uploader = uploader
+        self.folder_name = folder_name
+        self.workers = uploader.workers
+        self.uploaded_files = 0
+        self.uploaded_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.closed = False
+
+        # Objects already in the folder and their headers as last published -
+        # unchanged ones are not uploaded again
+        if uploader.skip_unchanged:
+            self.etags = uploader.list_etags(folder_name)
+            self.published = uploader.load_publish_manifest(folder_name)
+        else:
+            self.etags = {}
+            self.published = {}
+        self.records = {}
+
+    def write(self, path, data, content_type):
+        """Upload one file (skipped if the same content and headers are already there)"""
+        uploaded, record = self.uploader.upload_asset(
+            self.folder_name, path, data, content_type, self.etags.get(path), self.published.get(path)
+        )
+        with self.lock:
+            self.records[path] = record
+            if uploaded:
+                self.uploaded_files += 1
+                self.uploaded_bytes += len(data)
+            else:
+                self.skipped_files += 1
+                self.skipped_bytes += len(data)
+
+        # Written after close (search data of deferred OCR) - keep the manifest complete
+        if self.closed:
+            self._save_manifest()
+
+    def _save_manifest(self):
+        """Store records of this and earlier publishes into the folder"""
+        with self.lock:
+            records = dict(self.published)
+            records.update(self.records)
+        self.uploader.save_publish_manifest(self.folder_name, records)
+
+    def stats(self):
+        """Uploaded and skipped (unchanged) files and bytes, seconds since the sink was created"""
+        return {
+            'files': self.uploaded_files,
+            'bytes': self.uploaded_bytes,
+            'skipped_files': self.skipped_files,
+            'skipped_bytes': self.skipped_bytes,
+            'seconds': round(time.perf_counter() - self.started, 2)
+        }
+
+    def close(self):
+        """Store publish manifest, log upload stats"""
+        self.closed = True
+        self._save_manifest()
+
+        stats = self.stats()
+        print(f"Uploaded {stats['files']} files ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+              f"skipped {stats['skipped_files']} unchanged ({stats['skipped_bytes'] / 1024 / 1024:.1f} MB) "
+              f"in {stats['seconds']:.1f}s with {self.workers} workers")
+
+
+class MemorySink:
+    workers = 1
+    stage = 'package'
+
+    def __init__(self):
+        """In-memory sink - files end up in self.files (path -> bytes)"""
+        self.files = {}
+        self.content_types = {}
+
+    def write(self, path, data, content_type):
+        """Keep one file"""
+        self.files[path] = data
+        self.content_types[path] = content_type
+
+    def close(self):
+        """Nothing to finalize"""
+
+
+class StreamingPackage:
+    def __init__(self, sink, safe_title, progress=None):
+        """
+        Write flipbook to a sink while it is being converted
+
+        Pages are written (uploaded) as soon as the converter encodes them, so
+        the transfer hides behind render/OCR time. The remaining files follow
+        in finish() - index.html and search_data.json last, their presence
+        means the flipbook is complete.
+
+        Usage:
+            streaming = StreamingPackage(sink, safe_title)
+            converter = PDFToFlipbook(pdf_bytes, title, on_page=streaming.add_page)
+            streaming.finish(converter.convert())
+
+        Args:
+            sink: ZipSink, DirectorySink, S3Sink or MemorySink
+            safe_title: Sanitized title (name of the bundled PDF)
+            progress: Optional callback progress(sink.stage, done, total) per file, from finish()
+        """
+        self.sink = sink
+        self.safe_title = safe_title
+        self.progress = progress
+        self.executor = ThreadPoolExecutor(max_workers=max(1, sink.workers))
+        self.futures = []
+        self.written = set()
+
+    def _submit(self, path, data, content_type):
+        """Queue one file for writing (at most sink.workers at a time)"""
+        self.written.add(path)
+        self.futures.append(self.executor.submit(self.sink.write, path, data, content_type))
+
+    def add_page(self, page_num, page_bytes, thumb_bytes):
+        """Converter on_page callback - start writing a freshly encoded page"""
+        page_path, thumb_path = page_paths(page_num, page_bytes, thumb_bytes)
+        self._submit(page_path, page_bytes, 'image/jpeg')
+        self._submit(thumb_path, thumb_bytes, 'image/jpeg')
+
+    def _wait(self, done, total):
+        """Wait for all queued writes, re-raise the first failure"""
+        for future in self.futures:
+            future.result()
+            done += 1
+            if self.progress:
+                self.progress(self.sink.stage, done, total)
+        self.futures = []
+        return done
+
+    def finish(self, result):
+        """
+        Write the rest of the flipbook and close the sink
+
+        Args:
+            result: Dict from PDFToFlipbook.convert()
+        """
+        try:
+            remaining = [f for f in flipbook_files(result, self.safe_title) if f[0] not in self.written]
+            last = [f for f in remaining if f[0] in WRITTEN_LAST]
+            total = len(self.written) + len(remaining)
+
+            for path, data, content_type in remaining:
+                if path not in WRITTEN_LAST:
+                    self._submit(path, data, content_type)
+            done = self._wait(0, total)
+
+            for path, data, content_type in last:
+                self._submit(path, data, content_type)
+            self._wait(done, total)
+        finally:
+            self.executor.shutdown(wait=True)
+
+        self.sink.close()
+
+    def abort(self):
+        """Conversion failed - drop queued writes"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def write_flipbook_zip(result, safe_title, fileobj, progress=None, include_pdf=True):
+    """
+    Write complete offline flipbook as ZIP
+
+    Args:
+        result: Dict from PDFToFlipbook.convert()
+        safe_title: Sanitized title (name of the bundled PDF)
+        fileobj: Binary file object (or path) to write the ZIP to
+        progress: Optional callback progress('package', done, total) per file
+        include_pdf: Bundle the original PDF - leave it out where the ZIP is
+            returned inline and counts against a response size limit
+    """
+    package(result, ZipSink(fileobj), safe_title, progress, include_pdf)
+
+
+class _ChunkWriter(io.RawIOBase):
+    """
+    Write-only, unseekable file collecting what ZipFile writes
+
+    Because it cannot seek, ZipFile puts sizes and CRC into a data descriptor
+    after each entry instead of patching the local header afterwards.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Return and forget everything written so far"""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _StreamingZipSink(ZipSink):
+    def __init__(self):
+        """
+        ZIP sink handing every finished entry to another thread
+
+        The bounded queue holds back the writer while the client is behind,
+        cancelled tells it the client is gone.
+        """
+        self.writer = _ChunkWriter()
+        super().__init__(self.writer)
+        self.queue = queue.Queue(maxsize=STREAM_QUEUE_ENTRIES)
+        self.cancelled = threading.Event()
+
+    def write(self, path, data, content_type):
+        """Add one file to the archive and queue its bytes"""
+        super().write(path, data, content_type)
+        self.put(self.writer.drain())
+
+    def close(self):
+        """Write and queue central directory"""
+        super().close()
+        self.put(self.writer.drain())
+
+    def discard(self):
+        """Conversion failed - close the archive, the rest is never sent"""
+        self.zip_file.close()
+        self.writer.drain()
+
+    def put(self, item):
+        """Queue ZIP bytes (or end marker), waiting for the client - give up once it is gone"""
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                pass
+        raise ConnectionAbortedError('ZIP download cancelled')
+
+
+_STREAM_END = object()
+
+
+def stream_flipbook_zip(convert, safe_title):
+    """
+    Stream offline flipbook ZIP while the PDF is being converted
+
+    convert runs in a background thread. Page images and thumbnails go out
+    as soon as the converter encodes them, the remaining files after the
+    conversion - index.html and search_data.json last (see StreamingPackage).
+
+    Blocks until the first page is in the ZIP, so a conversion failing early
+    (unreadable PDF) still raises here, before any response is sent. A later
+    failure ends the stream without the central directory - the status is
+    sent by then, the client gets a broken download instead.
+
+    Args:
+        convert: Function convert(on_page) returning PDFToFlipbook.convert()
+            output, on_page goes to PDFToFlipbook
+        safe_title: Sanitized title (name of the bundled PDF)
+
+    Returns:
+        Iterator of ZIP bytes
+    """
+    sink = _StreamingZipSink()
+    streaming = StreamingPackage(sink, safe_title)
+
+    def on_page(page_num, page_bytes, thumb_bytes):
+        # Client gone - stop converting
+        if sink.cancelled.is_set():
+            raise ConnectionAbortedError('ZIP download cancelled')
+        streaming.add_page(page_num, page_bytes, thumb_bytes)
+
+    def run():
+        try:
+            streaming.finish(convert(on_page))
+            sink.put(_STREAM_END)
+        except Exception as e:
+            streaming.abort()
+            sink.discard()
+            try:
+                sink.put(e)
+            except ConnectionAbortedError:
+                pass
+
+    threading.Thread(target=run, daemon=True).start()
+
+    first = sink.queue.get()
+    if isinstance(first, Exception):
+        raise first
+
+    return _zip_chunks(sink, first)
+
+
+def _zip_chunks(sink, first):
+    """Yield queued ZIP bytes until the end marker, re-raise a conversion failure"""
+    try:
+        chunk = first
+        while chunk is not _STREAM_END:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+            chunk = sink.queue.get()
+    finally:
+        sink.cancelled.set()
@@ -5,38 +5,273 @@ Konvertuje PDF zpravodaj na interaktivní HTML flipbook (PyMuPDF verze)
 """
 
 import io
+import os
+import base64
+from concurrent.futures import ThreadPoolExecutor
 import fitz  # PyMuPDF
+import numpy as np
 from pathlib import Path
 from PIL import Image
 import pytesseract
 import json
 
+from lib.assets import hashed_name, page_paths
+
+
+# Conversion profiles - trade latency for quality per customer
+#   dpi           - resolution of full-size page images
+#   jpeg_quality  - page JPEG quality
+#   thumb_size    - maximum thumbnail size (width, height) in pixels
+#   encoder       - page JPEG encoder, one of ENCODERS
+#   text_source   - 'ocr' (Tesseract on every page), 'native' (PDF text layer only)
+#                   or 'auto' (text layer where present, Tesseract elsewhere)
+#   ocr_dpi       - resolution of the grayscale render used for OCR
+#   ocr_max_width - OCR render is capped to this width (posters, spreads)
+#   ocr_psm       - Tesseract page segmentation mode
+#   ocr_min_conf  - words with confidence at or below this are dropped
+#   tessdata      - None (system traineddata), 'fast' or 'best' (see TESSDATA_DIRS)
+#   reocr         - second OCR pass for pages whose first pass looks unreliable
+#                   (mean word confidence < min_mean_conf or share of kept words
+#                   < min_kept_ratio), run at its own dpi / tessdata; None disables it
+PROFILES = {
+    'fast': {
+        'dpi': 110,
+        'jpeg_quality': 80,
+        'thumb_size': (200, 300),
+        'encoder': 'pillow',
+        'text_source': 'auto',
+        'ocr_dpi': 150,
+        'ocr_max_width': 2000,
+        'ocr_psm': 1,
+        'ocr_min_conf': 30,
+        'tessdata': 'fast',
+        'reocr': {
+            'dpi': 250,
+            'tessdata': None,
+            'min_mean_conf': 55,
+            'min_kept_ratio': 0.6
+        }
+    },
+    'balanced': {
+        'dpi': 150,
+        'jpeg_quality': 85,
+        'thumb_size': (200, 300),
+        'encoder': 'pillow',
+        'text_source': 'ocr',
+        'ocr_dpi': 200,
+        'ocr_max_width': 2500,
+        'ocr_psm': 1,
+        'ocr_min_conf': 30,
+        'tessdata': None,
+        'reocr': {
+            'dpi': 300,
+            'tessdata': 'best',
+            'min_mean_conf': 60,
+            'min_kept_ratio': 0.7
+        }
+    },
+    'archival': {
+        'dpi': 220,
+        'jpeg_quality': 92,
+        'thumb_size': (200, 300),
+        'encoder': 'pillow',
+        'text_source': 'ocr',
+        'ocr_dpi': 300,
+        'ocr_max_width': 3600,
+        'ocr_psm': 1,
+        'ocr_min_conf': 30,
+        'tessdata': 'best',
+        'reocr': None
+    }
+}
+DEFAULT_PROFILE = 'balanced'
+
+# Directories with tessdata_fast / tessdata_best models (system traineddata if unset)
+TESSDATA_DIRS = {
+    'fast': os.getenv('TESSDATA_FAST_DIR'),
+    'best': os.getenv('TESSDATA_BEST_DIR')
+}
+
+# Page JPEG encoders:
+#   'pillow' - Pillow wraps the pixmap buffer zero-copy (Image.frombuffer), optimized JPEG
+#   'fitz'   - MuPDF encodes straight from the pixmap (pix.tobytes), no PIL involved
+ENCODERS = ('pillow', 'fitz')
+
+# CSS/JS referenced by index.html when bundled in the flipbook folder (ZIP);
+# published flipbooks use shared hashed copies instead (lib.assets.asset_urls)
+BUNDLED_ASSET_URLS = {
+    'css/style.css': 'css/style.css',
+    'js/jquery-3.6.0.min.js': 'js/jquery-3.6.0.min.js',
+    'js/turn.min.js': 'js/turn.min.js',
+    'js/qrcode.min.js': 'js/qrcode.min.js',
+    'js/flipbook.js': 'js/flipbook.js?v=3'
+}
+
+# Viewer image loading - pages load lazily, the current spread plus PAGE_LOOKAHEAD
+# pages before and after it; books with at least VIRTUAL_PAGES_MIN pages get their
+# page elements from an embedded list (added through turn.js) instead of inline markup
+PAGE_LOOKAHEAD = 4
+VIRTUAL_PAGES_MIN = 80
+
+# Thumbnail sprite sheets - the sidebar loads one image per SPRITE_PAGES pages
+# instead of one per page (per-page thumbnails are still written)
+SPRITE_COLUMNS = 5
+SPRITE_PAGES = 50
+SPRITE_JPEG_QUALITY = 80
+
+# Low-quality placeholder per page (tiny JPEG data URI, from the thumbnail) shown
+# by the viewer until the page image is decoded
+PLACEHOLDER_WIDTH = 32
+PLACEHOLDER_JPEG_QUALITY = 40
+
+# Embedded page JPEG is passed through only if it covers at least PASSTHROUGH_MIN_COVERAGE
+# of the page, lies inside it and has the page's aspect ratio - both within
+# PASSTHROUGH_TOLERANCE (share of the page size)
+PASSTHROUGH_MIN_COVERAGE = 0.98
+PASSTHROUGH_TOLERANCE = 0.02
+
+# Text render mode of invisible text (OCR layer of scans)
+INVISIBLE_TEXT = 3
+
+# Page counts as grayscale when max(R,G,B) - min(R,G,B) stays within this
+# tolerance for all but GRAY_MAX_COLOR_RATIO of (sampled) pixels
+GRAY_TOLERANCE = 24
+GRAY_MAX_COLOR_RATIO = 0.001
+
+# Page counts as blank (only e.g. a page number on it) when at most
+# BLANK_MAX_INK of pixels are darker than INK_LUMA and luma stddev stays low
+INK_LUMA = 200
+BLANK_MAX_INK = 0.002
+BLANK_MAX_STDDEV = 8.0
+
+# Blank pages carry no information, compress them hard
+BLANK_JPEG_QUALITY = 30
+
+# Pages physically larger than STRIP_OCR_MIN_AREA (PDF points^2 - A3 spreads,
+# posters; decided from the page, not the render, so neither the ocr_max_width cap
+# nor a high ocr_dpi changes it) are split into at least two horizontal strips of
+# at most STRIP_HEIGHT px, overlapping by STRIP_OVERLAP px, OCRed in parallel
+STRIP_OCR_MIN_AREA = 1.5 * 595 * 842  # 1.5x A4
+STRIP_HEIGHT = 1600
+STRIP_OVERLAP = 200
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def tesseract_config(psm, tessdata):
+    """
+    Build Tesseract config string
+
+    Args:
+        psm: Tesseract page segmentation mode
+        tessdata: None (system traineddata), 'fast' or 'best'
+
+    Returns:
+        Config string for pytesseract
+    """
+    config = f"--psm {psm}"
+
+    # Model directory not configured (the usual deployment) - system traineddata
+    tessdata_dir = TESSDATA_DIRS.get(tessdata)
+    if tessdata_dir:
+        config += f' --tessdata-dir "{tessdata_dir}"'
+
+    return config
+
 
 class PDFToFlipbook:
-    def __init__(self, pdf_bytes, title="Zpravodaj"):
+    def __init__(self, pdf_bytes, title="Zpravodaj", profile=DEFAULT_PROFILE, encoder=None, progress=None, on_page=None):
         """
         Initialize converter with PDF bytes
 
         Args:
             pdf_bytes: PDF file as bytes
             title: Title for the flipbook
+            profile: Conversion profile name, one of PROFILES
+            encoder: Page JPEG encoder, one of ENCODERS (overrides the profile)
+            progress: Optional callback progress(stage, done, total), stage is
+                'render' or 'ocr', done/total are page counts
+            on_page: Optional callback on_page(page_num, page_bytes, thumb_bytes)
+                called as soon as a page is encoded (see packaging.StreamingPackage)
         """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile '{profile}', expected one of {tuple(PROFILES)}")
+
+        encoder = encoder or PROFILES[profile]['encoder']
+        if encoder not in ENCODERS:
+            raise ValueError(f"Unknown encoder '{encoder}', expected one of {ENCODERS}")
+
         self.pdf_bytes = pdf_bytes
         self.title = title
+        self.profile_name = profile
+        self.profile = PROFILES[profile]
+        self.encoder = encoder
         self.pages_images = []  # Full size JPEGs
         self.thumb_images = []  # Thumbnails
+        self.page_paths = []  # Content-hashed (page image, thumbnail) paths in the flipbook
+        self.sprite_sheets = []  # Thumbnail sprite sheets - (path, JPEG bytes, (width, height))
+        self.sprite_positions = []  # Per page - sheet index and thumbnail box in it (see _build_sprites)
+        self.placeholders = []  # Per page placeholder data URIs (see _make_placeholder)
         self.page_texts = {}  # OCR extracted text
+        self.page_analysis = []  # Per-page pixel statistics (see _pixel_stats)
+        self.native_words = {}  # PDF text layer words per page (see _extract_native_words)
+        self.text_stats = {}  # Per-page text extraction statistics (source, OCR confidence)
+        self.progress = progress
+        self.on_page = on_page
 
-    def convert(self):
+    def convert(self, defer_ocr=False, asset_urls=None):
         """
         Main conversion function - returns dict with all assets
 
+        Args:
+            defer_ocr: Skip text extraction - 'search_data' is None and the
+                viewer loads search_data.json once extract_search_data()
+                has produced it (see app.py deferred mode)
+            asset_urls: Where index.html loads CSS/JS from, see
+                lib.assets.asset_urls() - default is the copies bundled
+                in the flipbook folder
+
         Returns:
-            dict with keys: 'html', 'css', 'js', 'pages', 'thumbs', 'search_data'
+            dict with keys: 'html', 'css', 'js', 'pages', 'thumbs', 'search_data', 'manifest'
         """
         # Convert PDF to images
         self._convert_pdf_to_images()
+        self._build_sprites()
 
+        # Extract text with OCR
+        search_data = None if defer_ocr else self.extract_search_data()
+
+        # Per-page metadata
+        manifest = self.get_manifest()
+
+        # Generate HTML/CSS/JS with embedded search data
+        html = self._generate_html(len(self.pages_images), search_data, asset_urls or BUNDLED_ASSET_URLS)
+        css = self._get_css()
+        js = self._get_js()
+
+        return {
+            'html': html,
+            'css': css,
+            'js': js,
+            'pages': self.pages_images,  # List of bytes (JPEG)
+            'thumbs': self.thumb_images,  # List of bytes (JPEG)
+            'page_paths': self.page_paths,  # List of (page image, thumbnail) paths
+            'sprites': [(path, data) for path, data, _ in self.sprite_sheets],  # Thumbnail sprite sheets
+            'search_data': search_data,  # JSON string (None if deferred)
+            'manifest': manifest,  # JSON string
+            'page_count': len(self.pages_images),
+            'pdf': self.pdf_bytes,  # Original PDF for download
+            'shared_assets': asset_urls is not None  # CSS/JS published separately (lib.assets)
+        }
+
+    def extract_search_data(self):
+        """
+        Extract text of all pages (text layer / OCR) for search
+
+        Needs rendered pages, i.e. runs after convert().
+
+        Returns:
+            Search data JSON string
+        """
         # Extract text with OCR
         self._extract_text_ocr()
 
@@ -46,11 +281,6 @@ class PDFToFlipbook:
             "positions": self.word_positions
         }, ensure_ascii=False, indent=2)
 
-        # Generate HTML/CSS/JS with embedded search data
-        html = self._generate_html(len(self.pages_images), search_data)
-        css = self._get_css()
-        js = self._get_js()
-
         # Debug: Print sample of search data
         if self.page_texts:
             first_page = list(self.page_texts.keys())[0]
@@ -58,100 +288,413 @@ class PDFToFlipbook:
             print(f"Search data sample (page {first_page}): {sample_text}...")
             print(f"Total pages with text: {len([t for t in self.page_texts.values() if t])}")
 
-        return {
-            'html': html,
-            'css': css,
-            'js': js,
-            'pages': self.pages_images,  # List of bytes (JPEG)
-            'thumbs': self.thumb_images,  # List of bytes (JPEG)
-            'search_data': search_data,  # JSON string
-            'page_count': len(self.pages_images),
-            'pdf': self.pdf_bytes  # Original PDF for download
-        }
+        return search_data
+
+    def get_manifest(self):
+        """
+        Return per-page metadata as JSON string (includes text stats once extracted)
+        """
+        return json.dumps(self._build_manifest(), ensure_ascii=False, indent=2)
 
     def _convert_pdf_to_images(self):
         """Convert PDF pages to images using PyMuPDF"""
         # Open PDF from bytes
         pdf_document = fitz.open(stream=self.pdf_bytes, filetype="pdf")
 
-        for page_num in range(len(pdf_document)):
+        passthrough_count = 0
+        total = len(pdf_document)
+
+        for page_num in range(total):
+            self._report_progress('render', page_num, total)
             page = pdf_document[page_num]
 
-            # Render page to image (150 DPI for full size)
-            mat = fitz.Matrix(150/72, 150/72)  # 72 is default DPI
+            # Use PDF text layer instead of OCR where the profile allows it
+            # (also the invisible OCR layer of scans passed through below)
+            if self.profile['text_source'] != 'ocr':
+                self._extract_native_words(page, page_num + 1)
+
+            # Scanned page = single embedded JPEG, reuse it instead of rendering
+            page_bytes = self._extract_page_image(pdf_document, page)
+            if page_bytes is not None:
+                self.pages_images.append(page_bytes)
+                with Image.open(io.BytesIO(page_bytes)) as img:
+                    img.draft(img.mode, self.profile['thumb_size'])  # Let libjpeg decode at reduced size
+                    pixels = np.asarray(img)
+                    self.page_analysis.append(self._pixel_stats(pixels.reshape(pixels.shape[0], pixels.shape[1], -1)))
+                    self.thumb_images.append(self._make_thumbnail(img))
+                self._emit_page(page_num + 1)
+                passthrough_count += 1
+                continue
+
+            # Render page to image (DPI from profile)
+            dpi = self.profile['dpi']
+            mat = fitz.Matrix(dpi/72, dpi/72)  # 72 is default DPI
             pix = page.get_pixmap(matrix=mat, alpha=False)
 
-            # Convert to PIL Image
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+            # Monochrome pages are stored single-channel (smaller, faster to encode and OCR)
+            analysis = self._analyze_page(pix)
+            self.page_analysis.append(analysis)
+            if analysis['grayscale'] or analysis['blank']:
+                pix = fitz.Pixmap(fitz.csGRAY, pix)
+
+            # Wrap pixmap buffer as PIL Image (zero-copy, pix must outlive img)
+            img = self._pixmap_to_image(pix)
 
             # Save full-size image to bytes
-            page_bytes = io.BytesIO()
-            img.save(page_bytes, 'JPEG', quality=85, optimize=True)
-            self.pages_images.append(page_bytes.getvalue())
+            quality = BLANK_JPEG_QUALITY if analysis['blank'] else self.profile['jpeg_quality']
+            self.pages_images.append(self._encode_page(pix, img, quality))
 
             # Create thumbnail
-            thumb = img.copy()
-            thumb.thumbnail((200, 300), Image.Resampling.LANCZOS)
-            thumb_bytes = io.BytesIO()
-            thumb.save(thumb_bytes, 'JPEG', quality=75)
-            self.thumb_images.append(thumb_bytes.getvalue())
+            self.thumb_images.append(self._make_thumbnail(img))
+
+            # Drop the zero-copy view before its pixmap is freed
+            del img
+
+            self._emit_page(page_num + 1)
 
         pdf_document.close()
+        self._report_progress('render', total, total)
+
+        if passthrough_count:
+            print(f"Reused embedded JPEG on {passthrough_count}/{len(self.pages_images)} pages")
+
+        blank_count = sum(1 for analysis in self.page_analysis if analysis['blank'])
+        if blank_count:
+            print(f"Detected {blank_count} blank pages (OCR will be skipped)")
+
+    def _extract_page_image(self, pdf_document, page):
+        """
+        Extract original JPEG of a page whose only content is one full-page image
+
+        Typical for scanned newsletters - returning the embedded stream avoids
+        rendering and a lossy re-encode. Images larger than the target
+        resolution are downscaled (decoded via JPEG draft mode), smaller or
+        equal ones are passed through byte for byte.
+
+        Args:
+            pdf_document: Open fitz.Document
+            page: fitz.Page
+
+        Returns:
+            JPEG bytes, or None if the page has to be rendered
+        """
+        if page.rotation or self._has_visible_text(page):
+            return None
+
+        images = page.get_image_info(xrefs=True)
+        if len(images) != 1 or not images[0]['xref']:
+            return None
+
+        # Image must be upright and cover (practically) the whole page
+        a, b, c, d, _, _ = images[0]['transform']
+        if b or c or a <= 0 or d <= 0:
+            return None
+        bbox = fitz.Rect(images[0]['bbox'])
+        page_rect = page.rect
+        tolerance_x = page_rect.width * PASSTHROUGH_TOLERANCE
+        tolerance_y = page_rect.height * PASSTHROUGH_TOLERANCE
+        if bbox.get_area() < page_rect.get_area() * PASSTHROUGH_MIN_COVERAGE:
+            return None
+        # Image overflowing the page would be shown uncropped
+        if (bbox.x0 < page_rect.x0 - tolerance_x or bbox.y0 < page_rect.y0 - tolerance_y
+                or bbox.x1 > page_rect.x1 + tolerance_x or bbox.y1 > page_rect.y1 + tolerance_y):
+            return None
+
+        # Nothing else may be painted over or under the image
+        if page.get_drawings():
+            return None
+
+        extracted = pdf_document.extract_image(images[0]['xref'])
+        if extracted['ext'] not in ('jpeg', 'jpg') or extracted['smask'] or extracted['colorspace'] not in (1, 3):
+            return None
+
+        # Image stretched to the page would be shown with its own proportions
+        image_aspect = extracted['width'] / extracted['height']
+        page_aspect = page_rect.width / page_rect.height
+        if abs(image_aspect / page_aspect - 1) > PASSTHROUGH_TOLERANCE:
+            return None
+
+        target_width = int(page.rect.width * self.profile['dpi'] / 72)
+        target_height = int(page.rect.height * self.profile['dpi'] / 72)
+        if extracted['width'] <= target_width * 1.05:
+            return extracted['image']
+
+        # Larger than needed - downscale to the render resolution
+        with Image.open(io.BytesIO(extracted['image'])) as img:
+            img.draft(img.mode, (target_width, target_height))
+            img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+            page_bytes = io.BytesIO()
+            img.save(page_bytes, 'JPEG', quality=self.profile['jpeg_quality'], optimize=True)
+            return page_bytes.getvalue()
+
+    def _analyze_page(self, pix):
+        """
+        Compute pixel statistics of a rendered page with NumPy
+
+        Works directly on the pixmap buffer, every 4th row and column is
+        enough for a reliable decision.
+
+        Args:
+            pix: fitz.Pixmap (RGB, no alpha)
+
+        Returns:
+            dict from _pixel_stats
+        """
+        samples = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+        rows = samples.reshape(pix.height, pix.stride)[::4, :pix.width * pix.n]
+        return self._pixel_stats(rows.reshape(-1, pix.width, pix.n)[:, ::4])
+
+    def _pixel_stats(self, pixels):
+        """
+        Classify page from its pixels
+
+        Args:
+            pixels: uint8 array of shape (height, width, channels), 1 or 3 channels
+
+        Returns:
+            dict with 'grayscale' and 'blank' flags, 'ink_coverage' (ratio of
+            dark pixels) and 'stddev' (of luma)
+        """
+        if pixels.shape[2] == 3:
+            # Chroma = spread between the strongest and the weakest channel
+            chroma = pixels.max(axis=2) - pixels.min(axis=2)
+            color_ratio = np.count_nonzero(chroma > GRAY_TOLERANCE) / chroma.size
+            grayscale = bool(color_ratio <= GRAY_MAX_COLOR_RATIO)
+            luma = pixels.dot(np.array([0.299, 0.587, 0.114], dtype=np.float32))
+        else:
+            grayscale = True
+            luma = pixels[:, :, 0].astype(np.float32)
+
+        ink_coverage = np.count_nonzero(luma < INK_LUMA) / luma.size
+        stddev = float(luma.std())
+
+        return {
+            'grayscale': grayscale,
+            'blank': bool(ink_coverage <= BLANK_MAX_INK and stddev <= BLANK_MAX_STDDEV),
+            'ink_coverage': round(ink_coverage, 5),
+            'stddev': round(stddev, 2)
+        }
+
+    def _pixmap_to_image(self, pix):
+        """
+        Wrap pixmap samples as PIL Image without copying
+
+        Args:
+            pix: fitz.Pixmap (RGB or gray, no alpha)
+
+        Returns:
+            Read-only PIL Image sharing memory with the pixmap
+        """
+        mode = "L" if pix.n == 1 else "RGB"
+        return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv,
+                                "raw", mode, pix.stride, 1)
+
+    def _encode_page(self, pix, img, quality):
+        """
+        Encode full-size page as JPEG with the configured encoder
+
+        Args:
+            pix: Rendered fitz.Pixmap
+            img: The same page wrapped as PIL Image
+            quality: JPEG quality
+
+        Returns:
+            JPEG bytes
+        """
+        if self.encoder == 'fitz':
+            return pix.tobytes("jpeg", jpg_quality=quality)
+
+        page_bytes = io.BytesIO()
+        img.save(page_bytes, 'JPEG', quality=quality, optimize=True)
+        return page_bytes.getvalue()
+
+    def _build_manifest(self):
+        """
+        Build per-page metadata for the flipbook
+
+        Returns:
+            dict with title, page count and a list of page entries
+        """
+        pages = []
+        for i, analysis in enumerate(self.page_analysis, start=1):
+            page = {'page': i, 'image': self.page_paths[i - 1][0], 'thumb': self.page_paths[i - 1][1]}
+            if self.sprite_positions:
+                page['sprite'] = self.sprite_positions[i - 1]
+            page['placeholder'] = self.placeholders[i - 1]
+            page.update(analysis)
+            if i in self.text_stats:
+                page['text'] = self.text_stats[i]
+            pages.append(page)
+
+        return {
+            'title': self.title,
+            'profile': self.profile_name,
+            'page_count': len(self.pages_images),
+            'sprites': [{'image': path, 'width': size[0], 'height': size[1]} for path, _, size in self.sprite_sheets],
+            'pages': pages
+        }
+
+    def _make_thumbnail(self, img):
+        """
+        Create JPEG thumbnail from rendered page image
+
+        Box-reduces the page by an integer factor first (cheap, and returns
+        a new small image, so no full-size copy is needed), then finishes
+        with LANCZOS on the already small image.
+
+        Args:
+            img: Full-size PIL image of the page
+
+        Returns:
+            Thumbnail JPEG bytes
+        """
+        thumb_size = self.profile['thumb_size']
+        factor = max(1, min(img.width // thumb_size[0], img.height // thumb_size[1]))
+        thumb = img.reduce(factor) if factor > 1 else img.copy()
+        thumb.thumbnail(thumb_size, Image.Resampling.LANCZOS)
+
+        thumb_bytes = io.BytesIO()
+        thumb.save(thumb_bytes, 'JPEG', quality=75)
+        return thumb_bytes.getvalue()
+
+    def _make_placeholder(self, thumb_bytes):
+        """
+        Create low-quality placeholder of a page
+
+        Scaled down from the thumbnail (libjpeg decodes it at reduced size
+        already), so the full-size page is not touched again.
+
+        Args:
+            thumb_bytes: Thumbnail JPEG bytes
+
+        Returns:
+            "data:image/jpeg;base64,..." URI, a few hundred bytes
+        """
+        size = (PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 2)
+        with Image.open(io.BytesIO(thumb_bytes)) as thumb:
+            thumb.draft(thumb.mode, size)
+            thumb.thumbnail(size, Image.Resampling.BILINEAR)
+            placeholder_bytes = io.BytesIO()
+            thumb.save(placeholder_bytes, 'JPEG', quality=PLACEHOLDER_JPEG_QUALITY, optimize=True)
+
+        return 'data:image/jpeg;base64,' + base64.b64encode(placeholder_bytes.getvalue()).decode('ascii')
+
+    def _build_sprites(self):
+        """
+        Pack thumbnails into sprite sheets
+
+        Every thumbnail gets a cell of the size of the largest one, at its
+        top left corner; SPRITE_COLUMNS cells per row, SPRITE_PAGES per sheet.
+        Fills self.sprite_sheets and self.sprite_positions (dicts with
+        'sheet' index and 'x', 'y', 'w', 'h' in pixels).
+        """
+        thumbs = [Image.open(io.BytesIO(thumb_bytes)) for thumb_bytes in self.thumb_images]
+        if not thumbs:
+            return
+
+        cell_width = max(thumb.width for thumb in thumbs)
+        cell_height = max(thumb.height for thumb in thumbs)
+
+        for start in range(0, len(thumbs), SPRITE_PAGES):
+            batch = thumbs[start:start + SPRITE_PAGES]
+            columns = min(SPRITE_COLUMNS, len(batch))
+            rows = -(-len(batch) // columns)
+            sheet = Image.new('RGB', (columns * cell_width, rows * cell_height), 'white')
+
+            for i, thumb in enumerate(batch):
+                x, y = (i % columns) * cell_width, (i // columns) * cell_height
+                sheet.paste(thumb.convert('RGB'), (x, y))
+                self.sprite_positions.append({
+                    'sheet': len(self.sprite_sheets),
+                    'x': x, 'y': y, 'w': thumb.width, 'h': thumb.height
+                })
+
+            sheet_bytes = io.BytesIO()
+            sheet.save(sheet_bytes, 'JPEG', quality=SPRITE_JPEG_QUALITY, optimize=True)
+            data = sheet_bytes.getvalue()
+            path = f"files/thumb/{hashed_name(f'sprite-{len(self.sprite_sheets) + 1}.jpg', data)}"
+            self.sprite_sheets.append((path, data, sheet.size))
+
+    def _thumbnail_markup(self, page_num):
+        """
+        Sidebar thumbnail - a box showing the page's cell of its sprite sheet
+
+        Background size and position are in percent, so the box scales with
+        the sidebar. The viewer sets the sheet as background once visible.
+        """
+        position = self.sprite_positions[page_num - 1]
+        sheet_path, _, (sheet_width, sheet_height) = self.sprite_sheets[position['sheet']]
+        width, height = position['w'], position['h']
+
+        def percent(offset, free):
+            return f"{offset / free * 100:.4f}%" if free else "0%"
+
+        style = (f"aspect-ratio: {width} / {height}; "
+                 f"background-size: {sheet_width / width * 100:.4f}% auto; "
+                 f"background-position: {percent(position['x'], sheet_width - width)} "
+                 f"{percent(position['y'], sheet_height - height)}")
+        return (f'<div class="thumbnail-item" data-page="{page_num}">'
+                f'<div class="thumb-sprite" role="img" aria-label="Stránka {page_num}" data-src="{sheet_path}" style="{style}"></div>'
+                f'<span class="thumb-page-num">{page_num}</span></div>')
 
     def _extract_text_ocr(self):
-        """Extract text from page images using OCR"""
+        """Extract text for search - PDF text layer or OCR of a dedicated grayscale render"""
         total = len(self.pages_images)
         print(f"Starting OCR extraction for {total} pages...")
 
         # Store word positions for highlighting
         self.word_positions = {}
 
+        # OCR renders its own pixmaps straight from the PDF
+        pdf_document = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+
+        ocr_config = tesseract_config(self.profile['ocr_psm'], self.profile['tessdata'])
+        reocr = self.profile['reocr']
+        if reocr:
+            reocr_config = tesseract_config(self.profile['ocr_psm'], reocr['tessdata'])
+        reocr_count = 0
+
         for i, page_bytes in enumerate(self.pages_images, start=1):
+            self._report_progress('ocr', i - 1, total)
             try:
-                # Open image from bytes
-                img = Image.open(io.BytesIO(page_bytes))
-
-                # Store original dimensions
-                original_width = img.width
-                original_height = img.height
-
-                # Resize image to speed up OCR (max width 2000px)
-                max_width = 2000
-                scale_factor = 1.0
-                if img.width > max_width:
-                    scale_factor = max_width / img.width
-                    new_size = (max_width, int(img.height * scale_factor))
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
-
-                # Run OCR with Czech language - get detailed word data
-                ocr_data = pytesseract.image_to_data(img, lang='ces', config='--psm 1', output_type=pytesseract.Output.DICT)
-
-                # Extract text for search
-                text_lines = []
-                word_boxes = []
-
-                for j in range(len(ocr_data['text'])):
-                    word = ocr_data['text'][j].strip()
-                    conf = int(ocr_data['conf'][j]) if ocr_data['conf'][j] != '-1' else 0
-
-                    if word and conf > 30:  # Only keep words with confidence > 30%
-                        text_lines.append(word)
-
-                        # Store word position (normalized to original image size)
-                        x = int(ocr_data['left'][j] / scale_factor)
-                        y = int(ocr_data['top'][j] / scale_factor)
-                        w = int(ocr_data['width'][j] / scale_factor)
-                        h = int(ocr_data['height'][j] / scale_factor)
-
-                        word_boxes.append({
-                            'word': word.lower(),
-                            'x': x,
-                            'y': y,
-                            'w': w,
-                            'h': h
-                        })
-
-                self.page_texts[str(i)] = ' '.join(text_lines)
+                # Read display image dimensions (header only, no decoding)
+                with Image.open(io.BytesIO(page_bytes)) as img:
+                    original_width = img.width
+                    original_height = img.height
+
+                # Page has a text layer - take words from the PDF instead of OCR (free, even
+                # on pages that look blank - a short sentence barely shows up in the pixels)
+                if i in self.native_words:
+                    word_boxes = self._native_word_boxes(i, original_width)
+                    self.text_stats[i] = {'source': 'native', 'words': len(word_boxes)}
+
+                # Blank pages are not worth Tesseract, 'native' profiles never OCR
+                elif self.page_analysis[i - 1]['blank'] or self.profile['text_source'] == 'native':
+                    self.page_texts[str(i)] = ""
+                    self.word_positions[str(i)] = {'boxes': [], 'width': original_width, 'height': original_height}
+                    continue
+
+                else:
+                    page = pdf_document[i - 1]
+                    word_boxes, stats = self._ocr_page(page, original_width, self.profile['ocr_dpi'], ocr_config)
+                    stats['passes'] = 1
+
+                    # Unreliable first pass - spend the expensive OCR only here
+                    if reocr and stats['candidates'] and (
+                            stats['mean_conf'] < reocr['min_mean_conf'] or
+                            stats['kept_ratio'] < reocr['min_kept_ratio']):
+                        second_boxes, second_stats = self._ocr_page(page, original_width, reocr['dpi'], reocr_config)
+                        reocr_count += 1
+                        if second_stats['mean_conf'] >= stats['mean_conf']:
+                            word_boxes, stats = second_boxes, second_stats
+                        stats['passes'] = 2
+
+                    self.text_stats[i] = {'source': 'ocr', 'words': len(word_boxes)}
+                    self.text_stats[i].update(stats)
+
+                self.page_texts[str(i)] = ' '.join(box['text'] for box in word_boxes)
+                for box in word_boxes:
+                    del box['text']
                 self.word_positions[str(i)] = {
                     'boxes': word_boxes,
                     'width': original_width,
@@ -166,8 +709,224 @@ class PDFToFlipbook:
                 self.page_texts[str(i)] = ""
                 self.word_positions[str(i)] = {'boxes': [], 'width': 0, 'height': 0}
 
-    def _generate_html(self, page_count, search_data_json):
-        """Generate HTML content with embedded search data"""
+        pdf_document.close()
+        self._report_progress('ocr', total, total)
+
+        if reocr_count:
+            print(f"  Re-OCR (second pass) on {reocr_count}/{total} pages")
+
+    def _emit_page(self, page_num):
+        """Name a finished page, make its placeholder and hand it to the on_page callback (if any)"""
+        self.page_paths.append(page_paths(page_num, self.pages_images[page_num - 1], self.thumb_images[page_num - 1]))
+        self.placeholders.append(self._make_placeholder(self.thumb_images[page_num - 1]))
+        if self.on_page:
+            self.on_page(page_num, self.pages_images[page_num - 1], self.thumb_images[page_num - 1])
+
+    def _report_progress(self, stage, done, total):
+        """Pass progress to the callback (if any) - a failing callback never stops conversion"""
+        if not self.progress:
+            return
+        try:
+            self.progress(stage, done, total)
+        except Exception as e:
+            print(f"  WARNING: progress callback failed: {e}")
+
+    def _ocr_page(self, page, image_width, dpi, config):
+        """
+        OCR a page rendered for Tesseract
+
+        The page is rendered once more as a grayscale pixmap at the given
+        DPI (capped to ocr_max_width) - a third of the RGB bytes, no JPEG
+        artifacts and no resize of the display image.
+
+        Args:
+            page: fitz.Page
+            image_width: Width of the display page image in pixels
+            dpi: OCR render resolution
+            config: Tesseract config string (see tesseract_config)
+
+        Returns:
+            Tuple (word_boxes, stats) - list of box dicts in display image pixels
+            ('text' holds the original word) and dict with 'mean_conf',
+            'kept_ratio' and 'candidates' (words recognized before filtering)
+        """
+        zoom = min(dpi / 72, self.profile['ocr_max_width'] / page.rect.width)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+
+        # Own copy of the samples - pytesseract may keep the image alive past the pixmap
+        img = Image.frombuffer("L", (pix.width, pix.height), pix.samples, "raw", "L", pix.stride, 1)
+
+        # Large pages are the tail latency of the conversion - OCR them in strips
+        if self._ocr_in_strips(page):
+            words = self._ocr_strips(img, config)
+        else:
+            words = self._ocr_image(img, config)
+
+        # OCR coordinates -> display image coordinates
+        scale_factor = pix.width / image_width
+        min_conf = self.profile['ocr_min_conf']
+        word_boxes = []
+        confidences = []
+
+        for word, conf, left, top, width, height in words:
+            confidences.append(max(conf, 0))
+
+            if conf > min_conf:  # Only keep words above profile confidence threshold
+                word_boxes.append({
+                    'text': word,
+                    'word': word.lower(),
+                    'x': int(left / scale_factor),
+                    'y': int(top / scale_factor),
+                    'w': int(width / scale_factor),
+                    'h': int(height / scale_factor)
+                })
+
+        stats = {
+            'mean_conf': round(sum(confidences) / len(confidences), 1) if confidences else 0.0,
+            'kept_ratio': round(len(word_boxes) / len(confidences), 3) if confidences else 0.0,
+            'candidates': len(confidences)
+        }
+        return word_boxes, stats
+
+    def _ocr_image(self, img, config, offset_y=0):
+        """
+        Run Tesseract on an image
+
+        Args:
+            img: PIL Image
+            config: Tesseract config string
+            offset_y: Added to word 'top' (position of a strip in the page)
+
+        Returns:
+            List of (word, conf, left, top, width, height) for non-empty words
+        """
+        # Run OCR with Czech language - get detailed word data
+        ocr_data = pytesseract.image_to_data(img, lang='ces', config=config,
+                                             output_type=pytesseract.Output.DICT)
+
+        words = []
+        for j in range(len(ocr_data['text'])):
+            word = ocr_data['text'][j].strip()
+            if word:
+                words.append((
+                    word,
+                    int(float(ocr_data['conf'][j])),
+                    ocr_data['left'][j],
+                    ocr_data['top'][j] + offset_y,
+                    ocr_data['width'][j],
+                    ocr_data['height'][j]
+                ))
+        return words
+
+    def _ocr_in_strips(self, page):
+        """
+        Decide whether a page is OCRed in strips
+
+        Uses the physical page size, not the render - ocr_max_width caps
+        spreads and posters to a few megapixels, while an ordinary A4 page
+        at archival ocr_dpi is just as tall in pixels and reads better whole.
+
+        Args:
+            page: fitz.Page
+
+        Returns:
+            True for pages of at least STRIP_OCR_MIN_AREA
+        """
+        return page.rect.width * page.rect.height >= STRIP_OCR_MIN_AREA
+
+    def _ocr_strips(self, img, config):
+        """
+        OCR a large image as overlapping horizontal strips in parallel
+
+        The image is cut into equal bands (at least two, at most STRIP_HEIGHT
+        px each). Every strip owns its band and is OCRed with STRIP_OVERLAP px
+        extra on both sides, so words cut by a band edge are whole in at least
+        one strip. A word is kept only by the strip owning its vertical
+        center, which removes duplicates from the overlaps.
+
+        Args:
+            img: PIL Image
+            config: Tesseract config string
+
+        Returns:
+            List of (word, conf, left, top, width, height) in image coordinates
+        """
+        count = max(2, -(-img.height // STRIP_HEIGHT))
+        band_height = -(-img.height // count)
+        bands = [(top, min(top + band_height, img.height)) for top in range(0, img.height, band_height)]
+
+        def ocr_band(band):
+            band_top, band_bottom = band
+            strip_top = max(0, band_top - STRIP_OVERLAP)
+            strip_bottom = min(img.height, band_bottom + STRIP_OVERLAP)
+            strip = img.crop((0, strip_top, img.width, strip_bottom))
+
+            return [entry for entry in self._ocr_image(strip, config, offset_y=strip_top)
+                    if band_top <= entry[3] + entry[5] // 2 < band_bottom]
+
+        # Tesseract runs as a subprocess, threads are enough for parallelism
+        with ThreadPoolExecutor(max_workers=OCR_WORKERS) as executor:
+            strips = list(executor.map(ocr_band, bands))
+
+        return [entry for strip_words in strips for entry in strip_words]
+
+    def _has_visible_text(self, page):
+        """
+        Check for text that is painted on the page
+
+        Invisible text (render mode 3, the OCR layer of scans) doesn't count,
+        it is not part of the page image.
+
+        Args:
+            page: fitz.Page
+
+        Returns:
+            True if some text span is visible
+        """
+        return any(span['type'] != INVISIBLE_TEXT and span['chars'] for span in page.get_texttrace())
+
+    def _extract_native_words(self, page, page_number):
+        """
+        Store words of the PDF text layer for a page (if it has any)
+
+        Args:
+            page: fitz.Page
+            page_number: 1-based page number
+        """
+        words = [w[:5] for w in page.get_text("words") if w[4].strip()]
+        if words:
+            self.native_words[page_number] = {'page_width': page.rect.width, 'words': words}
+
+    def _native_word_boxes(self, page_number, image_width):
+        """
+        Convert text layer words to search boxes in page image pixels
+
+        Args:
+            page_number: 1-based page number
+            image_width: Width of the page image in pixels
+
+        Returns:
+            List of box dicts ('text' holds the original word)
+        """
+        native = self.native_words[page_number]
+        scale = image_width / native['page_width']
+
+        return [{
+            'text': word,
+            'word': word.lower(),
+            'x': int(x0 * scale),
+            'y': int(y0 * scale),
+            'w': int((x1 - x0) * scale),
+            'h': int((y1 - y0) * scale)
+        } for x0, y0, x1, y1, word in native['words']]
+
+    def _generate_html(self, page_count, search_data_json, asset_urls):
+        """Generate HTML content with embedded search data, CSS/JS from asset_urls"""
+        # Large books - the viewer builds page elements from this list, only a few are in the DOM
+        virtual_pages = page_count >= VIRTUAL_PAGES_MIN
+        page_images_json = json.dumps([image for image, _ in self.page_paths]) if virtual_pages else 'null'
+        placeholders_json = json.dumps(self.placeholders) if virtual_pages else 'null'
+
         return f'''<!DOCTYPE html>
 <html lang="cs">
 <head>
@@ -175,12 +934,12 @@ class PDFToFlipbook:
     <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
     <meta name="apple-mobile-web-app-capable" content="yes">
     <title>{self.title}</title>
-    <link rel="stylesheet" href="css/style.css">
+    <link rel="stylesheet" href="{asset_urls['css/style.css']}">
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
     <!-- Local JS libraries for offline support -->
-    <script src="js/jquery-3.6.0.min.js"></script>
-    <script src="js/turn.min.js"></script>
-    <script src="js/qrcode.min.js"></script>
+    <script src="{asset_urls['js/jquery-3.6.0.min.js']}"></script>
+    <script src="{asset_urls['js/turn.min.js']}"></script>
+    <script src="{asset_urls['js/qrcode.min.js']}"></script>
     <!-- Google Analytics -->
     <script async src="https://www.googletagmanager.com/gtag/js?id=G-XXXXXXXXXX"></script>
     <script>
@@ -235,13 +994,13 @@ class PDFToFlipbook:
         <!-- Thumbnail sidebar (toggled by menu button) -->
         <div id="thumbnail-sidebar" class="thumbnail-sidebar-hidden">
             <div id="thumbnail-sidebar-content">
-                {''.join(f'<div class="thumbnail-item" data-page="{i}"><img src="files/thumb/{i}.jpg" alt="Stránka {i}"><span class="thumb-page-num">{i}</span></div>' for i in range(1, page_count + 1))}
+                {''.join(self._thumbnail_markup(i) for i in range(1, page_count + 1))}
             </div>
         </div>
 
         <div id="flipbook-viewer" style="position: relative;">
             <div id="flipbook">
-                {''.join(f'<div class="page"><img src="files/pages/{i}.jpg" alt="Stránka {i}"></div>' for i in range(1, page_count + 1))}
+                {'' if virtual_pages else ''.join(f'<div class="page" style="background-image: url({placeholder})"><img data-src="{image}" data-page="{i}" alt="Stránka {i}"></div>' for i, ((image, _), placeholder) in enumerate(zip(self.page_paths, self.placeholders), start=1))}
             </div>
             <!-- Highlight overlay for search results - outside flipbook to avoid turn.js manipulation -->
             <div id="highlight-overlay"></div>
@@ -327,9 +1086,16 @@ class PDFToFlipbook:
     <script>
         const totalPages = {page_count};
         // Embedded search data for offline use
-        const searchDataEmbedded = {search_data_json};
+        const searchDataEmbedded = {search_data_json or 'null'};
+        // Search data still being indexed in the background - loaded from here when ready
+        const searchDataUrl = {'null' if search_data_json else '"search_data.json"'};
+        // Lazy page loading - pages preloaded around the current spread
+        const pageLookahead = {PAGE_LOOKAHEAD};
+        // Page images of large books (page elements are created by the viewer), null if inline
+        const pageImages = {page_images_json};
+        const pagePlaceholders = {placeholders_json};
     </script>
-    <script src="js/flipbook.js?v=3"></script>
+    <script src="{asset_urls['js/flipbook.js']}"></script>
 </body>
 </html>'''
 
@@ -449,7 +1215,8 @@ body {
     width: 50%;
     height: 100%;
     background-color: white;
-    background-size: cover;
+    background-size: contain; /* Placeholder - same box as the image */
+    background-repeat: no-repeat;
     background-position: center;
     pointer-events: auto;
     user-select: none;
@@ -463,6 +1230,12 @@ body {
     object-position: center;
     pointer-events: none;
     user-select: none;
+    opacity: 0; /* Placeholder shows through until the image is decoded */
+    transition: opacity 0.2s;
+}
+
+#flipbook .page img.loaded {
+    opacity: 1;
 }
 
 /* Turn.js corner areas - make them bigger */
@@ -549,6 +1322,13 @@ body {
     display: block;
 }
 
+/* Thumbnail cut out of a sprite sheet (size and position set inline) */
+.thumb-sprite {
+    width: 100%;
+    background-color: white;
+    background-repeat: no-repeat;
+}
+
 .thumb-page-num {
     position: absolute;
     bottom: 5px;
@@ -1081,6 +1861,31 @@ let zoomClickY = 0;
 // Search data - use embedded data from HTML
 let searchData = typeof searchDataEmbedded !== 'undefined' ? searchDataEmbedded : null;
 
+// Search index is built in the background - poll until search_data.json appears
+let searchIndexing = !searchData && typeof searchDataUrl !== 'undefined' && !!searchDataUrl;
+
+function pollSearchData() {
+    fetch(searchDataUrl, { cache: 'no-store' })
+        .then(response => {
+            if (!response.ok) throw new Error('HTTP ' + response.status);
+            return response.json();
+        })
+        .then(data => {
+            searchData = data;
+            searchIndexing = false;
+            console.log('Search data loaded (background indexing finished)');
+
+            // Re-run search the user may have typed while indexing
+            const query = searchInput.val().trim();
+            if (query.length >= 2) {
+                performSearch(query);
+            }
+        })
+        .catch(() => {
+            setTimeout(pollSearchData, 5000);
+        });
+}
+
 // Log search data status
 if (searchData) {
     console.log('Search data loaded successfully (embedded)!');
@@ -1088,10 +1893,91 @@ if (searchData) {
     const firstPageText = searchData.pages['1'] || '';
     console.log('Sample page 1 length:', firstPageText.length, 'characters');
     console.log('Sample text:', firstPageText.substring(0, 100) + '...');
+} else if (searchIndexing) {
+    console.log('Search index is being built - waiting for', searchDataUrl);
+    pollSearchData();
 } else {
     console.warn('Search data not available - searching will not work');
 }
 
+// Lazy image loading - pages get their src only near the current spread,
+// thumbnails once they scroll into the sidebar. Large books (pageImages)
+// create their page elements here and add them through turn.js, which
+// keeps only the pages around the current one in the DOM.
+const lookahead = typeof pageLookahead !== 'undefined' ? pageLookahead : 4;
+const virtualPages = typeof pageImages !== 'undefined' && Array.isArray(pageImages);
+const pageElements = virtualPages
+    ? pageImages.map((src, index) => createPageElement(index + 1, src, pagePlaceholders && pagePlaceholders[index]))
+    : flipbook.children('.page').toArray().map(element => $(element));
+
+function createPageElement(page, src, placeholder) {
+    const img = $('<img>').attr({'data-src': src, 'data-page': page, 'alt': 'Stránka ' + page});
+    const element = $('<div class="page"></div>').append(img);
+    if (placeholder) {
+        element.css('background-image', `url(${placeholder})`);
+    }
+    return element;
+}
+
+// Keep the placeholder (page background) until the image is fully decoded - no half-drawn pages
+function showWhenDecoded(img, src) {
+    const show = () => img.classList.add('loaded');
+    img.classList.remove('loaded');
+    img.src = src;
+    if (img.decode) {
+        img.decode().then(show, show);
+    } else {
+        img.onload = img.onerror = show;
+    }
+}
+
+function loadPagesAround(page) {
+    // +1 - the other half of a double spread
+    const first = Math.max(1, page - lookahead);
+    const last = Math.min(pageElements.length, page + lookahead + 1);
+
+    pageElements.forEach((element, index) => {
+        const pageNum = index + 1;
+        const img = element.find('img');
+        if (pageNum >= first && pageNum <= last) {
+            if (!img.attr('src')) {
+                showWhenDecoded(img[0], img.attr('data-src'));
+            }
+        } else if (virtualPages && img.attr('src') && Math.abs(pageNum - page) > lookahead * 3) {
+            // Far from the reader - drop the image so the browser can free the decoded bitmap
+            img.removeAttr('src').removeClass('loaded');
+        }
+    });
+}
+
+function observeThumbnails() {
+    // Sprite boxes get their sheet as background (one request per sheet), images their src
+    const images = thumbnailSidebar.find('[data-src]').toArray();
+    const load = element => {
+        const src = element.getAttribute('data-src');
+        if (element.tagName !== 'IMG') {
+            element.style.backgroundImage = `url("${src}")`;
+        } else if (!element.getAttribute('src')) {
+            element.setAttribute('src', src);
+        }
+    };
+
+    if (!('IntersectionObserver' in window)) {
+        images.forEach(load);
+        return;
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                load(entry.target);
+                observer.unobserve(entry.target);
+            }
+        });
+    }, { root: thumbnailSidebar[0], rootMargin: '300px 0px' });
+    images.forEach(img => observer.observe(img));
+}
+
 // Initialize turn.js
 $(document).ready(function() {
     // Calculate dimensions based on viewport
@@ -1125,6 +2011,12 @@ $(document).ready(function() {
         }
     }
 
+    // Large books start with the first spread, the rest is added after init
+    if (virtualPages) {
+        flipbook.append(pageElements.slice(0, 2).map(element => element[0]));
+    }
+    loadPagesAround(1);
+
     flipbook.turn({
         width: bookWidth,
         height: bookHeight,
@@ -1143,9 +2035,12 @@ $(document).ready(function() {
                     e.preventDefault();
                     return false;
                 }
+                // Start loading the target spread while the page turns
+                loadPagesAround(page);
             },
             turned: function(e, page) {
                 currentPageSpan.text(page);
+                loadPagesAround(page);
                 updateThumbnails(page);
 
                 // Apply pending highlight if exists
@@ -1175,6 +2070,13 @@ $(document).ready(function() {
         }
     });
 
+    if (virtualPages) {
+        for (let page = 3; page <= pageElements.length; page++) {
+            flipbook.turn('addPage', pageElements[page - 1], page);
+        }
+    }
+    observeThumbnails();
+
     // Update page display
     currentPageSpan.text(1);
     updateThumbnails(1);
@@ -1721,6 +2623,11 @@ function performSearch(query) {
     console.log('performSearch called with:', query);
     console.log('searchData available:', !!searchData);
 
+    if (!searchData && searchIndexing) {
+        searchResults.html('<p><i class="fas fa-spinner fa-spin"></i> Probíhá indexování vyhledávání&hellip; Výsledky se zobrazí automaticky.</p>');
+        return;
+    }
+
     if (!searchData) {
         searchResults.html('<p style="color: red;">Vyhledávací data se nenačetla. Zkontrolujte konzoli.</p>');
         return;
@@ -1832,7 +2739,7 @@ function highlightSearchOnPage(pageNum, query) {
         const currentView = flipbook.turn('view');
         console.log('Current view:', currentView);
 
-        const pageElement = $(`.page:has(img[src*="/${pageNum}.jpg"])`);
+        const pageElement = $(`.page:has(img[data-page="${pageNum}"])`);
         console.log('Page element found:', pageElement.length);
 
         if (!pageElement || !pageElement.length) {
@@ -2088,8 +2995,9 @@ fullscreenBtn.click(function() {
 
 // Download PDF button
 downloadPdfBtn.click(function() {
-    // Trigger download of original PDF (if available in same directory)
-    const pdfFilename = document.title.replace(/[^a-z0-9]/gi, '-').toLowerCase() + '.pdf';
+    // Trigger download of original PDF (if available in same directory) - named like lib.packaging.safe_name
+    const pdfTitle = document.title.normalize('NFKD').replace(/[\\u0300-\\u036f]/g, '');
+    const pdfFilename = pdfTitle.replace(/[^a-z0-9]/gi, '-').toLowerCase() + '.pdf';
 
     // Try to download using <a> tag for better download behavior
     const link = document.createElement('a');
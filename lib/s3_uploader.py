@@ -2,85 +2,197 @@
 S3 Uploader for flipbook assets
 """
 
+import os
+import json
+import base64
+import hashlib
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from lib.assets import ASSETS_DIR, cache_control, precompressed
+from lib.packaging import publish_shared_assets, S3Sink, StreamingPackage
+
+# Parallel uploads per flipbook - all threads share one client, its
+# connection pool is sized to match so no thread waits for a connection
+UPLOAD_WORKERS = 16
+
+# Attempts per object - botocore 'standard' retry mode backs off
+# exponentially with random jitter on throttling, 5xx and connection errors
+UPLOAD_ATTEMPTS = 5
+
+# ACL of published files
+PUBLIC_ACL = 'public-read'
+
+# Private object in every folder recording ETag and headers of the published
+# files - unchanged files are skipped without a request per file
+PUBLISH_MANIFEST = '.publish.json'
+
 
 class S3Uploader:
-    def __init__(self, bucket_name, region='us-east-1'):
+    def __init__(self, bucket_name, region='us-east-1', workers=UPLOAD_WORKERS, skip_unchanged=True, endpoint_url=None):
         """
         Initialize S3 uploader
 
         Args:
             bucket_name: S3 bucket name
             region: AWS region
+            workers: Parallel uploads (and pooled connections)
+            skip_unchanged: Don't re-upload files whose MD5 matches the
+                existing object's ETag and whose headers and ACL recorded
+                in the folder's PUBLISH_MANIFEST are the same (re-publishing
+                into the same folder)
+            endpoint_url: S3-compatible endpoint (MinIO, moto server),
+                default AWS_S3_ENDPOINT_URL or AWS
         """
         self.bucket_name = bucket_name
         self.region = region
-        self.s3_client = boto3.client('s3', region_name=region)
-
-    def upload_flipbook(self, flipbook_data, folder_name):
+        self.workers = workers
+        self.skip_unchanged = skip_unchanged
+        self.endpoint_url = endpoint_url or os.environ.get('AWS_S3_ENDPOINT_URL')
+        self.s3_client = boto3.client('s3', region_name=region, endpoint_url=self.endpoint_url, config=Config(
+            max_pool_connections=workers,
+            retries={'mode': 'standard', 'total_max_attempts': UPLOAD_ATTEMPTS}
+        ))
+
+    def stream_flipbook(self, folder_name, safe_title, progress=None):
         """
-        Upload complete flipbook to S3
+        Start uploading a flipbook while it is being converted
+
+        Pages upload as soon as they are encoded, the rest (HTML last)
+        follows in finish() - see packaging.StreamingPackage.
 
         Args:
-            flipbook_data: Dict from PDFToFlipbook.convert()
             folder_name: Base folder path (e.g., "account/zpravodaj-123")
+            safe_title: Sanitized title (name of the bundled PDF)
+            progress: Optional callback progress('upload', done, total) per file
 
         Returns:
-            Dict with URLs to uploaded files
+            StreamingPackage - pass its add_page as PDFToFlipbook on_page,
+            then call finish() with the convert() result
+        """
+        return StreamingPackage(S3Sink(self, folder_name), safe_title, progress)
+
+    def publish_shared_assets(self):
+        """Upload shared CSS/JS (lib.assets) to assets/ in the bucket root, unless already there"""
+        publish_shared_assets(S3Sink(self, ASSETS_DIR), f"s3://{self.bucket_name}")
+
+    def folder_url(self, folder_name):
+        """Public URL of a flipbook folder"""
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket_name}/{folder_name}"
+        return f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{folder_name}"
+
+    def list_etags(self, folder_name):
         """
-        base_url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{folder_name}"
+        Get ETags of objects already in a flipbook folder
+
+        One list_objects_v2 call per 1000 objects instead of a HEAD per file.
+
+        Args:
+            folder_name: Flipbook folder
+
+        Returns:
+            Dict path relative to the folder -> ETag (MD5 hex for single-part uploads)
+        """
+        prefix = f"{folder_name}/"
+        etags = {}
 
         try:
-            # Upload HTML
-            self._upload_file(
-                f"{folder_name}/index.html",
-                flipbook_data['html'].encode('utf-8'),
-                'text/html'
-            )
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                for obj in page.get('Contents', []):
+                    etags[obj['Key'][len(prefix):]] = obj['ETag'].strip('"')
+        except ClientError as e:
+            raise Exception(f"Failed to list S3 folder: {str(e)}")
 
-            # Upload CSS
-            self._upload_file(
-                f"{folder_name}/css/style.css",
-                flipbook_data['css'].encode('utf-8'),
-                'text/css'
-            )
+        return etags
+
+    def load_publish_manifest(self, folder_name):
+        """
+        Get the records of the last publish into a folder
+
+        Args:
+            folder_name: Flipbook folder
+
+        Returns:
+            Dict path relative to the folder -> record (see upload_asset),
+            empty if the folder has no PUBLISH_MANIFEST
+        """
+        try:
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=f"{folder_name}/{PUBLISH_MANIFEST}")
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return {}
+            raise Exception(f"Failed to read publish manifest: {str(e)}")
 
-            # Upload JS
-            self._upload_file(
-                f"{folder_name}/js/flipbook.js",
-                flipbook_data['js'].encode('utf-8'),
-                'application/javascript'
+        return json.loads(obj['Body'].read())
+
+    def save_publish_manifest(self, folder_name, records):
+        """
+        Store the records of a publish into a folder (private, not cached)
+
+        Args:
+            folder_name: Flipbook folder
+            records: Dict path relative to the folder -> record (see upload_asset)
+        """
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=f"{folder_name}/{PUBLISH_MANIFEST}",
+                Body=json.dumps(records, sort_keys=True).encode('utf-8'),
+                ContentType='application/json',
+                CacheControl='no-cache'
             )
+        except ClientError as e:
+            raise Exception(f"Failed to write publish manifest: {str(e)}")
+
+    def upload_asset(self, folder_name, name, data, content_type, etag=None, published=None):
+        """
+        Upload a single additional file into a published flipbook
 
-            # Upload page images
-            page_urls = []
-            for i, page_bytes in enumerate(flipbook_data['pages'], start=1):
-                key = f"{folder_name}/files/pages/{i}.jpg"
-                self._upload_file(key, page_bytes, 'image/jpeg')
-                page_urls.append(f"{base_url}/files/pages/{i}.jpg")
-
-            # Upload thumbnails
-            thumb_urls = []
-            for i, thumb_bytes in enumerate(flipbook_data['thumbs'], start=1):
-                key = f"{folder_name}/files/thumb/{i}.jpg"
-                self._upload_file(key, thumb_bytes, 'image/jpeg')
-                thumb_urls.append(f"{base_url}/files/thumb/{i}.jpg")
-
-            return {
-                'index_url': f"{base_url}/index.html",
-                'css_url': f"{base_url}/css/style.css",
-                'js_url': f"{base_url}/js/flipbook.js",
-                'pages': page_urls,
-                'thumbs': thumb_urls,
-                'base_url': base_url
-            }
+        Args:
+            folder_name: Flipbook folder (as passed to stream_flipbook)
+            name: Path relative to the folder (e.g. "search_data.json")
+            data: File content (bytes)
+            content_type: MIME type
+            etag: ETag of the existing object (from list_etags), if any
+            published: Its record from the publish manifest, if any
 
+        Returns:
+            Tuple (uploaded, record) - uploaded is False if the object and
+            its headers are unchanged and the upload was skipped, record
+            (ETag, headers, ACL) goes into the publish manifest
+        """
+        # S3 can't negotiate encodings - text files are stored gzipped (every browser accepts gzip)
+        encoding = None
+        gzipped = precompressed(name, data, content_type).get('gzip')
+        if gzipped is not None:
+            data, encoding = gzipped, 'gzip'
+
+        key = f"{folder_name}/{name}"
+        md5 = hashlib.md5(data).digest()
+        record = {
+            'etag': md5.hex(),
+            'content_type': content_type,
+            'cache_control': cache_control(key),
+            'content_encoding': encoding,
+            'acl': PUBLIC_ACL
+        }
+
+        # Same content and same headers as published last time - no request at all
+        # (objects without a record, e.g. published before the manifest, go up once more)
+        if etag == record['etag'] and published == record:
+            return False, record
+
+        try:
+            self._upload_file(key, data, content_type, md5, record['cache_control'], encoding)
         except ClientError as e:
             raise Exception(f"Failed to upload to S3: {str(e)}")
 
-    def _upload_file(self, key, data, content_type):
+        return True, record
+
+    def _upload_file(self, key, data, content_type, md5=None, cache=None, encoding=None):
         """
         Upload single file to S3
 
@@ -88,11 +200,19 @@ class S3Uploader:
             key: S3 object key
             data: File content (bytes)
             content_type: MIME type
+            md5: MD5 digest of data - S3 verifies it and rejects corrupted uploads
+            cache: Cache-Control header (default from the key, see lib.assets.cache_control)
+            encoding: Content-Encoding of data (e.g. 'gzip'), None for plain
         """
+        md5 = md5 or hashlib.md5(data).digest()
+        extra = {'ContentEncoding': encoding} if encoding else {}
         self.s3_client.put_object(
             Bucket=self.bucket_name,
             Key=key,
             Body=data,
             ContentType=content_type,
-            ACL='public-read'  # Make files publicly accessible
+            ContentMD5=base64.b64encode(md5).decode('ascii'),
+            CacheControl=cache or cache_control(key),
+            ACL=PUBLIC_ACL,  # Make files publicly accessible
+            **extra
         )
@@ -0,0 +1,32 @@
+"""
+Only files named by hashed_name() are cached as immutable
+"""
+
+import pytest
+
+from lib.assets import CACHE_IMMUTABLE, CACHE_SHORT, cache_control
+
+
+@pytest.mark.parametrize('path', [
+    'account/zpravodaj/files/pages/1.0123abcd.jpg',
+    'account/zpravodaj/files/thumb/1.0123abcd.jpg',
+    'account/zpravodaj/files/thumb/sprite-1.0123abcd.jpg',
+    'files/pages/12.0123abcd.jpg',
+    'assets/flipbook.0123abcd.js',
+    'assets/style.0123abcd.css'
+])
+def test_hashed_files_are_immutable(path):
+    assert cache_control(path) == CACHE_IMMUTABLE
+
+
+@pytest.mark.parametrize('path', [
+    'account/zpravodaj/index.html',
+    'account/zpravodaj/manifest.json',
+    # User content that merely looks hashed
+    'account/report.deadbeef/report.deadbeef.pdf',
+    'account/zpravodaj/report.deadbeef.pdf',
+    'account/assets/flipbook.0123abcd.js',
+    'assets/zpravodaj/report.deadbeef.pdf'
+])
+def test_other_files_are_short_lived(path):
+    assert cache_control(path) == CACHE_SHORT
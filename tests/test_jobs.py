@@ -0,0 +1,67 @@
+"""
+SQLite job leases - jobs of dead workers are reclaimed, a worker that lost
+its lease cannot overwrite the result of the attempt that took over
+"""
+
+import io
+import time
+
+import pytest
+
+from lib import jobs
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOBS_DIR', tmp_path)
+    return jobs.SQLiteJobStore()
+
+
+def _expire_lease(store, job_id):
+    with store._connect() as conn:
+        conn.execute('UPDATE jobs SET lease_expires_at = ? WHERE id = ?', (time.time() - 1, job_id))
+
+
+def test_running_job_is_not_claimed_twice(store):
+    job_id = store.create({'title': 'T'}, b'%PDF')
+
+    assert store.claim('a')['id'] == job_id
+    assert store.claim('b') is None
+
+
+def test_expired_lease_is_reclaimed(store):
+    job_id = store.create({'title': 'T'}, b'%PDF')
+    store.claim('a')
+    _expire_lease(store, job_id)
+
+    assert store.claim('b')['id'] == job_id
+    assert not store.heartbeat(job_id, 'a')
+    assert store.heartbeat(job_id, 'b')
+
+
+def test_lost_lease_does_not_overwrite_result(store):
+    job_id = store.create({'title': 'T'}, b'%PDF')
+    store.claim('a')
+    _expire_lease(store, job_id)
+    store.claim('b')
+
+    assert store.save_result(job_id, io.BytesIO(b'new'), 'b')
+    assert not store.save_result(job_id, io.BytesIO(b'stale'), 'a')
+    assert store.open_result(job_id).read_bytes() == b'new'
+
+    store.complete(job_id, {'page_count': 1}, 'a')
+    assert store.get(job_id)['status'] == 'running'
+    store.complete(job_id, {'page_count': 1}, 'b')
+    assert store.get(job_id)['status'] == 'done'
+
+
+def test_job_fails_after_last_attempt(store):
+    job_id = store.create({'title': 'T'}, b'%PDF')
+    for n in range(jobs.MAX_ATTEMPTS):
+        assert store.claim(f'w{n}')['id'] == job_id
+        _expire_lease(store, job_id)
+
+    assert store.claim('last') is None
+    job = store.get(job_id)
+    assert job['status'] == 'error'
+    assert job['error'] == 'Worker stopped responding'
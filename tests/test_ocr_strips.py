@@ -0,0 +1,58 @@
+"""
+Large pages (A3 spreads, posters) must be OCRed in strips in every profile
+"""
+
+import fitz
+import pytest
+from PIL import Image
+
+from lib.pdf_converter import PDFToFlipbook, PROFILES, tesseract_config
+
+# Page sizes in PDF points
+A4 = (595, 842)
+A3_SPREAD = (1191, 842)
+A1_POSTER = (1684, 2384)
+
+
+def _ocr_path(profile, size):
+    """Run _ocr_page on an empty page of the given size, return 'strips' or 'single'"""
+    document = fitz.open()
+    page = document.new_page(width=size[0], height=size[1])
+
+    converter = PDFToFlipbook(b'', profile=profile)
+    calls = []
+    converter._ocr_image = lambda img, config, offset_y=0: calls.append(('single', img.size)) or []
+    converter._ocr_strips = lambda img, config: calls.append(('strips', img.size)) or []
+
+    settings = PROFILES[profile]
+    converter._ocr_page(page, 1000, settings['ocr_dpi'], tesseract_config(settings['ocr_psm'], None))
+    document.close()
+    return calls[0][0]
+
+
+@pytest.mark.parametrize('profile', list(PROFILES))
+@pytest.mark.parametrize('size', [A3_SPREAD, A1_POSTER], ids=['a3-spread', 'a1-poster'])
+def test_large_pages_use_strips(profile, size):
+    assert _ocr_path(profile, size) == 'strips'
+
+
+@pytest.mark.parametrize('profile', list(PROFILES))
+def test_a4_page_is_ocred_whole(profile):
+    assert _ocr_path(profile, A4) == 'single'
+
+
+def test_strips_cover_image_with_overlap():
+    converter = PDFToFlipbook(b'')
+    tops = []
+
+    def fake_ocr(img, config, offset_y=0):
+        tops.append((offset_y, img.height))
+        # One word centered in every strip
+        return [('slovo', 90, 0, offset_y + img.height // 2, 10, 10)]
+
+    converter._ocr_image = fake_ocr
+
+    words = converter._ocr_strips(Image.new('L', (2500, 1769), 255), '')
+    assert len(tops) == 2
+    assert tops[0][0] == 0 and tops[1][0] + tops[1][1] == 1769
+    assert len(words) == 2
@@ -0,0 +1,72 @@
+"""
+Titles and accounts become names safe as folders, S3 keys and URL parts,
+ZIP downloads stream while the PDF is being converted
+"""
+
+import io
+import re
+import zipfile
+import threading
+
+import fitz
+import pytest
+
+from lib.packaging import SAFE_NAME_DEFAULT, WRITTEN_LAST, safe_name, stream_flipbook_zip
+from lib.pdf_converter import PDFToFlipbook
+
+
+@pytest.mark.parametrize('text, name', [
+    ('Zpravodaj', 'zpravodaj'),
+    ('Frýdek-Místek 09/2025', 'frydek-mistek-09-2025'),
+    ('a?b#c', 'a-b-c'),
+    ('../../etc', '------etc'),
+    ('/t', '-t')
+])
+def test_safe_name(text, name):
+    assert safe_name(text) == name
+
+
+@pytest.mark.parametrize('text', ['', '.', '..', '/', ' ', '???'])
+def test_nothing_usable_gives_default(text):
+    assert safe_name(text) == SAFE_NAME_DEFAULT
+
+
+@pytest.mark.parametrize('text', ['Říjen 2025 \\ x', 'a%20b', 'x\r\ny', 'ß / ł'])
+def test_only_lowercase_letters_digits_and_dashes(text):
+    assert re.fullmatch(r'[a-z0-9-]+', safe_name(text))
+
+
+def _text_pdf(pages=3):
+    document = fitz.open()
+    for n in range(pages):
+        document.new_page(width=595, height=842).insert_text((72, 72), f'Strana {n + 1} zpravodaje', fontsize=12)
+    return document.tobytes()
+
+
+def test_zip_streams_pages_before_conversion_ends():
+    first_page_sent = threading.Event()
+
+    def convert(on_page):
+        converter = PDFToFlipbook(_text_pdf(), 'T', profile='fast', on_page=on_page)
+        result = converter.convert()
+        # Page entries are out while the conversion is still running
+        assert first_page_sent.wait(10)
+        return result
+
+    chunks = stream_flipbook_zip(convert, 't')
+    data = next(chunks)
+    first_page_sent.set()
+    data += b''.join(chunks)
+
+    names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+    assert names[0].startswith('files/')
+    assert names[-2:] == list(WRITTEN_LAST)
+    assert 't.pdf' in names
+
+
+def test_zip_stream_raises_early_failure():
+    def convert(on_page):
+        return PDFToFlipbook(b'not a pdf', 'T', profile='fast', on_page=on_page).convert()
+
+    with pytest.raises(Exception):
+        stream_flipbook_zip(convert, 't')
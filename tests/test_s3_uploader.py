@@ -0,0 +1,144 @@
+"""
+Re-publishing into an S3 folder skips objects that would not change - same
+content, headers and ACL as recorded in the publish manifest - without a
+request per object
+"""
+
+import json
+
+import pytest
+
+moto = pytest.importorskip('moto')
+boto3 = pytest.importorskip('boto3')
+
+from lib import s3_uploader
+from lib.packaging import S3Sink, write_files
+from lib.s3_uploader import PUBLISH_MANIFEST, S3Uploader
+
+BUCKET = 'flipbooks'
+FOLDER = 'account/zpravodaj'
+
+FILES = [
+    ('index.html', b'<html>' + b'<p>Zpravodaj</p>' * 200 + b'</html>', 'text/html'),
+    ('files/pages/1.0123abcd.jpg', b'\xff\xd8' + bytes(range(256)) * 20, 'image/jpeg'),
+    ('manifest.json', b'{"pages": []}', 'application/json')
+]
+
+
+@pytest.fixture
+def uploader(monkeypatch):
+    monkeypatch.delenv('AWS_S3_ENDPOINT_URL', raising=False)
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    with moto.mock_aws():
+        uploader = S3Uploader(BUCKET, region='us-east-1', workers=2)
+        uploader.s3_client.create_bucket(Bucket=BUCKET)
+        yield uploader
+
+
+def _publish(uploader, files=FILES):
+    """Write files through a fresh sink, return its stats and the S3 operations it called"""
+    calls = []
+
+    def record(event_name, **kwargs):
+        calls.append(event_name.split('.')[-1])
+
+    uploader.s3_client.meta.events.register('before-call.s3', record)
+    try:
+        sink = S3Sink(uploader, FOLDER)
+        write_files(files, sink)
+        sink.close()
+    finally:
+        uploader.s3_client.meta.events.unregister('before-call.s3', record)
+
+    return sink.stats(), calls
+
+
+def _manifest(uploader):
+    obj = uploader.s3_client.get_object(Bucket=BUCKET, Key=f'{FOLDER}/{PUBLISH_MANIFEST}')
+    return json.loads(obj['Body'].read())
+
+
+def test_first_publish_uploads_everything(uploader):
+    stats, _ = _publish(uploader)
+
+    assert (stats['files'], stats['skipped_files']) == (3, 0)
+    head = uploader.s3_client.head_object(Bucket=BUCKET, Key=f'{FOLDER}/index.html')
+    assert head['ContentEncoding'] == 'gzip'
+    assert head['CacheControl'] == 'public, max-age=60'
+    assert _manifest(uploader)['index.html']['content_encoding'] == 'gzip'
+
+
+def test_unchanged_files_cost_no_requests(uploader):
+    _publish(uploader)
+    stats, calls = _publish(uploader)
+
+    assert (stats['files'], stats['skipped_files']) == (0, 3)
+    assert stats['skipped_bytes'] == sum(len(data) for _, data, _ in FILES)
+    # Listing, manifest read and manifest write - nothing per file
+    assert sorted(calls) == ['GetObject', 'ListObjectsV2', 'PutObject']
+
+
+def test_changed_content_is_uploaded(uploader):
+    _publish(uploader)
+    files = [FILES[0], FILES[1], ('manifest.json', b'{"pages": [1]}', 'application/json')]
+    stats, _ = _publish(uploader, files)
+
+    assert (stats['files'], stats['skipped_files']) == (1, 2)
+
+
+def test_changed_cache_control_is_uploaded(uploader, monkeypatch):
+    _publish(uploader)
+    monkeypatch.setattr(s3_uploader, 'cache_control', lambda key: 'no-cache')
+
+    stats, _ = _publish(uploader)
+
+    assert (stats['files'], stats['skipped_files']) == (3, 0)
+    head = uploader.s3_client.head_object(Bucket=BUCKET, Key=f'{FOLDER}/files/pages/1.0123abcd.jpg')
+    assert head['CacheControl'] == 'no-cache'
+
+
+def test_changed_content_encoding_is_uploaded(uploader, monkeypatch):
+    _publish(uploader)
+    monkeypatch.setattr(s3_uploader, 'precompressed', lambda path, data, content_type: {})
+
+    stats, _ = _publish(uploader)
+
+    # Only index.html was gzipped (the rest is small or a JPEG)
+    assert (stats['files'], stats['skipped_files']) == (1, 2)
+    assert 'ContentEncoding' not in uploader.s3_client.head_object(Bucket=BUCKET, Key=f'{FOLDER}/index.html')
+
+
+def test_other_acl_is_uploaded(uploader):
+    _publish(uploader)
+    records = _manifest(uploader)
+    records['manifest.json']['acl'] = 'private'
+    uploader.save_publish_manifest(FOLDER, records)
+
+    stats, _ = _publish(uploader)
+
+    assert (stats['files'], stats['skipped_files']) == (1, 2)
+    assert _manifest(uploader)['manifest.json']['acl'] == 'public-read'
+
+
+def test_folder_without_manifest_is_uploaded_once(uploader):
+    _publish(uploader)
+    uploader.s3_client.delete_object(Bucket=BUCKET, Key=f'{FOLDER}/{PUBLISH_MANIFEST}')
+
+    stats, _ = _publish(uploader)
+    assert (stats['files'], stats['skipped_files']) == (3, 0)
+
+    stats, _ = _publish(uploader)
+    assert (stats['files'], stats['skipped_files']) == (0, 3)
+
+
+def test_write_after_close_updates_manifest(uploader):
+    sink = S3Sink(uploader, FOLDER)
+    write_files(FILES, sink)
+    sink.close()
+
+    # Deferred OCR stores search data once the flipbook is published
+    sink.write('search_data.json', b'{"pages": {}}', 'application/json')
+
+    assert 'search_data.json' in _manifest(uploader)
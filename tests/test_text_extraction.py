@@ -0,0 +1,36 @@
+"""
+Pages that look blank keep the words of their PDF text layer
+"""
+
+import json
+
+import fitz
+
+from lib.pdf_converter import PDFToFlipbook
+
+
+def test_blank_looking_pages_keep_text_layer(monkeypatch):
+    document = fitz.open()
+    page = document.new_page(width=1191, height=842)  # A3 spread, little text
+    page.insert_text((100, 100), 'Kalendar akci', fontsize=24)
+    page.insert_text((100, 140), 'Rijen 2025 - program kulturniho domu', fontsize=11)
+    page = document.new_page(width=595, height=842)  # A4, one short sentence
+    page.insert_text((72, 400), 'Tato strana byla zamerne ponechana prazdna.', fontsize=11)
+    document.new_page(width=595, height=842)  # Really blank
+
+    converter = PDFToFlipbook(document.tobytes(), profile='fast')
+    ocr_calls = []
+    monkeypatch.setattr(converter, '_ocr_page', lambda *args: ocr_calls.append(args) or ([], {}))
+    result = converter.convert()
+
+    # No Tesseract - text layer or blank
+    assert ocr_calls == []
+
+    manifest = json.loads(result['manifest'])['pages']
+    assert [page['blank'] for page in manifest] == [True, True, True]
+    assert manifest[0]['text'] == {'source': 'native', 'words': 8}
+
+    pages = json.loads(result['search_data'])['pages']
+    assert pages['1'] == 'Kalendar akci Rijen 2025 - program kulturniho domu'
+    assert pages['2'] == 'Tato strana byla zamerne ponechana prazdna.'
+    assert pages['3'] == ''
@@ -0,0 +1,36 @@
+"""
+Conversion worker - pulls jobs from the Postgres job queue
+
+Run any number of these on any number of nodes next to the web app
+(JOB_BACKEND=postgres, same DATABASE_URL). Tables are created by lib.db.init_db().
+
+Usage: python worker.py [threads]
+"""
+
+import sys
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+from lib.jobs import PostgresJobStore, JobWorkers, JOB_WORKERS
+
+
+def main():
+    """CLI entry point"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else JOB_WORKERS
+
+    print(f"Starting {count} conversion worker thread(s)...")
+    workers = JobWorkers(PostgresJobStore(), count)
+
+    try:
+        workers.run()
+    except KeyboardInterrupt:
+        # Running jobs are picked up by other workers once their lease expires
+        print("Stopping workers")
+
+
+if __name__ == "__main__":
+    main()